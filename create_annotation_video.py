@@ -40,6 +40,9 @@ Examples:
   # Create video for specific frame range
   python create_annotation_video.py --start-frame 0 --num-frames 100
   
+  # Encode through ffmpeg (H.264), using NVENC on NVIDIA GPUs
+  python create_annotation_video.py --backend ffmpegcv --gpu
+  
   # Export as individual images instead of video
   python create_annotation_video.py --export-images --output-dir output/frames
         """
@@ -100,6 +103,19 @@ Examples:
         choices=['mp4v', 'avc1', 'XVID', 'MJPG'],
         help='Video codec (default: mp4v)'
     )
+    parser.add_argument(
+        '--backend',
+        type=str,
+        default='opencv',
+        choices=['opencv', 'ffmpegcv'],
+        help='Video writer backend (default: opencv); ffmpegcv needs the "video" '
+             'extra (uv sync --extra video) and an ffmpeg binary on PATH'
+    )
+    parser.add_argument(
+        '--gpu',
+        action='store_true',
+        help='Use NVENC hardware encoding (implies --backend ffmpegcv)'
+    )
     parser.add_argument(
         '--export-images',
         action='store_true',
@@ -125,11 +141,11 @@ Examples:
     annotation_path = Path(args.annotation)
     
     if not data_path.exists():
-        logger.error(f"Thermal data file not found: {data_path}")
+        logger.error("Thermal data file not found: %s", data_path)
         return 1
     
     if not annotation_path.exists():
-        logger.error(f"Annotation file not found: {annotation_path}")
+        logger.error("Annotation file not found: %s", annotation_path)
         return 1
     
     # Create exporter
@@ -150,9 +166,7 @@ Examples:
             num_frames=args.num_frames,
             image_format=args.image_format
         )
-        logger.info(f"\n{'='*60}")
-        logger.info(f"SUCCESS: Frames exported to {output_dir}")
-        logger.info(f"{'='*60}\n")
+        logger.info("\n%s\nSUCCESS: Frames exported to %s\n%s\n", '=' * 60, output_dir, '=' * 60)
     else:
         # Export as video
         logger.info("Creating annotated video...")
@@ -160,17 +174,17 @@ Examples:
             args.output,
             start_frame=args.start_frame,
             num_frames=args.num_frames,
-            codec=args.codec
+            codec=args.codec,
+            backend='ffmpegcv' if args.gpu else args.backend,
+            gpu=args.gpu
         )
-        logger.info(f"\n{'='*60}")
-        logger.info(f"SUCCESS: Video created at {output_file}")
-        logger.info(f"{'='*60}\n")
+        logger.info("\n%s\nSUCCESS: Video created at %s\n%s\n", '=' * 60, output_file, '=' * 60)
     
     # Create summary if requested
     if args.create_summary:
         summary_path = Path(args.output).parent / "dataset_summary.txt"
         exporter.create_summary_report(str(summary_path))
-        logger.info(f"Summary report created: {summary_path}")
+        logger.info("Summary report created: %s", summary_path)
     
     return 0
 
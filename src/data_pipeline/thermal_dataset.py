@@ -9,19 +9,38 @@ This module implements a custom PyTorch Dataset that:
 
 import json
 import logging
+import os
 import requests
+import time
 import zlib
-import struct
 import base64
 import numpy as np
 import torch
+from requests.adapters import HTTPAdapter
 from torch.utils.data import Dataset, DataLoader
 from typing import Dict, List, Tuple, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Celsius value (float32) for every int16 deciKelvin code, indexed by the
+# code's unsigned 16-bit pattern; computed with the same float64 math as a
+# direct conversion, so lookups are bit-identical to it
+_DECIKELVIN_TO_CELSIUS = (
+    np.arange(1 << 16, dtype=np.uint16).view(np.int16) / 10.0 - 273.15
+).astype(np.float32)
+
+
+# Longest SQL statement sent to TDengine. 2.x rejects statements above
+# maxSQLLength (65480 bytes by default) and 3.x above 1 MB; stay under both
+_MAX_SQL_LENGTH = 60000
+
 
 class TDengineConnector:
     """
@@ -49,7 +68,29 @@ class TDengineConnector:
         self.database = database
         self.base_url = f"http://{host}:{port}/rest/sql"
         
-        logger.info(f"Initialized TDengine connector: {host}:{port}/{database}")
+        # Pooled keep-alive HTTP session, created lazily per process
+        self._session = None
+        self._session_pid = None
+        
+        logger.info("Initialized TDengine connector: %s:%s/%s", host, port, database)
+    
+    @property
+    def session(self) -> requests.Session:
+        """
+        HTTP session reused across queries so the TCP connection stays open.
+        
+        A new session is created after a fork (e.g. in DataLoader workers) so
+        processes never share a pooled socket.
+        """
+        if self._session is None or self._session_pid != os.getpid():
+            session = requests.Session()
+            session.auth = (self.user, self.password)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+            self._session_pid = os.getpid()
+        return self._session
     
     def query_frame_by_timestamp(self, mac_address: str, timestamp_ms: int,
                                  tolerance_ms: int = 100) -> Optional[np.ndarray]:
@@ -64,59 +105,56 @@ class TDengineConnector:
         Returns:
             Thermal frame as numpy array (40, 60) in Celsius, or None if not found
         """
-        # Convert timestamp to TDengine format
-        timestamp_sec = timestamp_ms / 1000.0
-        dt = datetime.utcfromtimestamp(timestamp_sec)
-        ts_str = dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]  # Millisecond precision
-        
-        # Calculate time window
-        start_sec = (timestamp_ms - tolerance_ms) / 1000.0
-        end_sec = (timestamp_ms + tolerance_ms) / 1000.0
-        start_dt = datetime.utcfromtimestamp(start_sec)
-        end_dt = datetime.utcfromtimestamp(end_sec)
-        start_str = start_dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-        end_str = end_dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        # Calculate time window in TDengine format
+        start_str = self._format_timestamp(timestamp_ms - tolerance_ms)
+        end_str = self._format_timestamp(timestamp_ms + tolerance_ms)
         
         # Build table name from MAC
         table_name = f"sensor_{mac_address.replace(':', '_')}"
         
-        # Query frame data within tolerance window
+        # Query frame data within tolerance window; the window only holds a
+        # few rows, so they are ranked client-side instead of sorted on the server
         sql = f"""
         SELECT ts, frame_data, width, height
         FROM {table_name}
         WHERE ts >= '{start_str}' AND ts <= '{end_str}'
-        ORDER BY ts ASC
-        LIMIT 1
         """
         
         try:
             url = f"{self.base_url}/{self.database}"
-            response = requests.post(
+            response = self.session.post(
                 url,
-                auth=(self.user, self.password),
                 data=sql,
                 timeout=10
             )
             
             if response.status_code != 200:
-                logger.error(f"HTTP error {response.status_code}")
+                logger.error("HTTP error %s", response.status_code)
                 return None
             
-            result = response.json()
+            # Responses carry large hex/base64 frame payloads; decode the raw
+            # body with orjson when available
+            result = orjson.loads(response.content) if orjson is not None else response.json()
             
             if result.get('code') != 0:
                 error_msg = result.get('desc', result.get('msg', 'Unknown error'))
-                logger.error(f"Query failed: {error_msg}")
+                logger.error("Query failed: %s", error_msg)
                 return None
             
             data = result.get('data', [])
             
             if not data:
-                logger.warning(f"No frame found for timestamp {timestamp_ms}")
+                logger.warning("No frame found for timestamp %s", timestamp_ms)
                 return None
             
+            # Pick the row closest to the requested timestamp (earliest on ties)
+            row_ts_ms = np.array(
+                [row[0][:23] for row in data], dtype='datetime64[ms]'
+            ).astype(np.int64)
+            best = np.lexsort((row_ts_ms, np.abs(row_ts_ms - timestamp_ms)))[0]
+            
             # Extract frame data
-            row = data[0]
+            row = data[best]
             encoded_frame_data = row[1]  # Compressed frame data
             width = row[2] if len(row) > 2 else 60
             height = row[3] if len(row) > 3 else 40
@@ -127,7 +165,7 @@ class TDengineConnector:
             return frame
             
         except Exception as e:
-            logger.error(f"Error fetching frame: {e}")
+            logger.error("Error fetching frame: %s", e)
             return None
     
     def _decompress_frame_data(self, encoded_data: str, width: int = 60, 
@@ -144,13 +182,12 @@ class TDengineConnector:
             Numpy array (height, width) in Celsius
         """
         try:
-            # Decode from hex or base64
+            # Decode from hex or base64. bytes.fromhex rejects non-hex input
+            # at the first bad character, so no separate scan is needed; hex
+            # is always tried first because hex text is also valid base64
             try:
-                if all(c in '0123456789abcdefABCDEF' for c in encoded_data):
-                    compressed_bytes = bytes.fromhex(encoded_data)
-                else:
-                    compressed_bytes = base64.b64decode(encoded_data)
-            except:
+                compressed_bytes = bytes.fromhex(encoded_data)
+            except (ValueError, TypeError):
                 compressed_bytes = base64.b64decode(encoded_data)
             
             # Decompress with zlib
@@ -160,115 +197,235 @@ class TDengineConnector:
             
             # Detect format by size
             if len(decompressed) == num_pixels * 2:
-                # int16 format (deciKelvin)
-                frame_data = struct.unpack(f'{num_pixels}h', decompressed)
-                # Convert deciKelvin to Celsius
-                frame_celsius = np.array([(val / 10.0) - 273.15 for val in frame_data], dtype=np.float32)
+                # int16 format (deciKelvin): a single lookup-table gather over
+                # the column-reversed raw codes converts to Celsius and applies
+                # the left-right flip, producing a fresh contiguous frame
+                codes = np.frombuffer(decompressed, dtype=np.uint16).reshape(height, width)
+                frame = _DECIKELVIN_TO_CELSIUS.take(codes[:, ::-1])
             elif len(decompressed) == num_pixels * 4:
-                # float32 format (Celsius)
-                frame_data = struct.unpack(f'{num_pixels}f', decompressed)
-                frame_celsius = np.array(frame_data, dtype=np.float32)
+                # float32 format (Celsius); read-only view over the buffer
+                frame_celsius = np.frombuffer(decompressed, dtype=np.float32)
+                
+                # Left-right flip for correct orientation, materialised as a
+                # writable C-contiguous frame in one strided copy (PyTorch
+                # rejects negative strides)
+                frame = np.ascontiguousarray(frame_celsius.reshape(height, width)[:, ::-1])
             else:
                 raise ValueError(f"Unexpected data size: {len(decompressed)}")
             
-            # Reshape to (height, width)
-            frame = frame_celsius.reshape(height, width)
-            
-            # Apply left-right flip for correct orientation
-            # Make a copy to avoid negative stride issues with PyTorch
-            frame = np.fliplr(frame).copy()
-            
             return frame
             
         except Exception as e:
-            logger.error(f"Error decompressing frame: {e}")
+            logger.error("Error decompressing frame: %s", e)
             raise
     
+    @staticmethod
+    def _format_timestamp(timestamp_ms: int) -> str:
+        """Format a UTC millisecond timestamp as a TDengine time literal."""
+        # Integer split plus C-level gmtime; no datetime objects needed
+        seconds, millis = divmod(int(timestamp_ms), 1000)
+        t = time.gmtime(seconds)
+        return (f"{t.tm_year}-{t.tm_mon:02d}-{t.tm_mday:02d} "
+                f"{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}.{millis:03d}")
+    
+    def _query_rows(self, sql: str, timeout: int) -> Optional[List]:
+        """
+        Run one SQL statement over the REST API.
+        
+        Args:
+            sql: SQL statement
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Result rows, or None if the request or query failed (logged)
+        """
+        try:
+            url = f"{self.base_url}/{self.database}"
+            response = self.session.post(
+                url,
+                data=sql,
+                timeout=timeout
+            )
+            
+            if response.status_code != 200:
+                logger.error("HTTP error %s", response.status_code)
+                return None
+            
+            # Responses carry large hex/base64 frame payloads; decode the raw
+            # body with orjson when available. The response (and its cached
+            # raw body) is released on return, so it is not held alongside
+            # the parsed rows and the decoded frames
+            result = orjson.loads(response.content) if orjson is not None else response.json()
+            
+            if result.get('code') != 0:
+                error_msg = result.get('desc', result.get('msg', 'Unknown error'))
+                logger.error("Query failed: %s", error_msg)
+                return None
+            
+            return result.get('data', [])
+            
+        except Exception as e:
+            logger.error("Query error: %s", e)
+            return None
+    
     def batch_query_frames(self, mac_address: str, timestamps_ms: List[int],
-                          tolerance_ms: int = 100) -> Dict[int, np.ndarray]:
+                          tolerance_ms: int = 100,
+                          num_workers: Optional[int] = None,
+                          cluster_gap_ms: int = 5000) -> Dict[int, np.ndarray]:
         """
         Query multiple frames by timestamps (batch query for efficiency).
         
         Args:
             mac_address: Sensor MAC address
-            timestamps_ms: List of timestamps in milliseconds
+            timestamps_ms: Timestamps in milliseconds (list or int64 array)
             tolerance_ms: Matching tolerance
+            num_workers: Number of decompression threads (None = CPU count)
+            cluster_gap_ms: Gap between consecutive timestamps that starts a
+                new time range in the query (at least twice tolerance_ms)
             
         Returns:
             Dictionary mapping timestamp_ms to frame arrays
         """
-        frames = {}
+        frames, _ = self._batch_query(mac_address, timestamps_ms, tolerance_ms,
+                                      num_workers, cluster_gap_ms)
+        return frames
+    
+    def _batch_query(self, mac_address: str, timestamps_ms: List[int],
+                     tolerance_ms: int = 100,
+                     num_workers: Optional[int] = None,
+                     cluster_gap_ms: int = 5000) -> Tuple[Dict[int, np.ndarray], set]:
+        """
+        Batch frame query that also reports which timestamps it answered.
         
-        # Calculate overall time range
-        min_ts = min(timestamps_ms) - tolerance_ms
-        max_ts = max(timestamps_ms) + tolerance_ms
+        Args:
+            See batch_query_frames
+            
+        Returns:
+            Tuple of (frames, answered): frames maps timestamp_ms to frame
+            arrays; answered holds every requested timestamp whose query
+            succeeded, so those missing from frames have no frame in TDengine
+        """
+        frames = {}
+        answered = set()
         
-        min_dt = datetime.utcfromtimestamp(min_ts / 1000.0)
-        max_dt = datetime.utcfromtimestamp(max_ts / 1000.0)
+        # Requested timestamps as one sorted, de-duplicated int64 array
+        sorted_targets = np.unique(np.asarray(timestamps_ms, dtype=np.int64))
+        if sorted_targets.size == 0:
+            return frames, answered
         
-        start_str = min_dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-        end_str = max_dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        # Split the timestamps into contiguous clusters and query only the
+        # range around each one, so sparse annotations do not pull every
+        # frame between the first and last timestamp. Gaps within twice the
+        # tolerance never split a cluster, so the ranges are disjoint and
+        # ascending, and rows of successive statements concatenate in ts order
+        split_gap_ms = max(cluster_gap_ms, 2 * tolerance_ms)
+        breaks = np.flatnonzero(np.diff(sorted_targets) > split_gap_ms) + 1
+        range_starts = sorted_targets[np.r_[0, breaks]] - tolerance_ms
+        range_ends = sorted_targets[np.r_[breaks - 1, len(sorted_targets) - 1]] + tolerance_ms
+        range_clauses = [
+            f"(ts >= '{self._format_timestamp(start)}' AND ts <= '{self._format_timestamp(end)}')"
+            for start, end in zip(range_starts.tolist(), range_ends.tolist())
+        ]
         
         # Build table name
         table_name = f"sensor_{mac_address.replace(':', '_')}"
         
-        # Query all frames in range
-        sql = f"""
-        SELECT ts, frame_data, width, height
-        FROM {table_name}
-        WHERE ts >= '{start_str}' AND ts <= '{end_str}'
-        ORDER BY ts ASC
-        """
+        # Query all frames in the clustered ranges, packing as many ranges
+        # into each statement as fit under TDengine's SQL length limit
+        select = f"SELECT ts, frame_data, width, height FROM {table_name} WHERE "
+        order_by = " ORDER BY ts ASC"
+        statements = []
+        clauses = []
+        cluster_statement = []  # Statement index of each cluster
+        length = len(select) + len(order_by)
+        for clause in range_clauses:
+            if clauses and length + len(clause) + 4 > _MAX_SQL_LENGTH:
+                statements.append(select + " OR ".join(clauses) + order_by)
+                clauses = []
+                length = len(select) + len(order_by)
+            clauses.append(clause)
+            cluster_statement.append(len(statements))
+            length += len(clause) + 4  # " OR " separator
+        statements.append(select + " OR ".join(clauses) + order_by)
         
         try:
-            url = f"{self.base_url}/{self.database}"
-            response = requests.post(
-                url,
-                auth=(self.user, self.password),
-                data=sql,
-                timeout=60
-            )
+            # A statement that fails only loses its own ranges; those samples
+            # fall back to per-frame queries
+            data = []
+            statement_ok = np.zeros(len(statements), dtype=bool)
+            for i, sql in enumerate(statements):
+                rows = self._query_rows(sql, timeout=60)
+                if rows is not None:
+                    data.extend(rows)
+                    statement_ok[i] = True
+            logger.info("Batch query found %s frames in %s statement(s)", len(data), len(statements))
             
-            if response.status_code != 200:
-                logger.error(f"HTTP error {response.status_code}")
-                return frames
+            # Targets whose cluster's statement succeeded
+            target_cluster = np.searchsorted(breaks, np.arange(len(sorted_targets)), side='right')
+            answered_mask = statement_ok[np.asarray(cluster_statement)[target_cluster]]
             
-            result = response.json()
+            # Parse all frame timestamps (handle both formats: space and T
+            # separator) in one vectorized datetime64 conversion. Like the
+            # query literals above, they are UTC
+            frame_ts_ms = np.array(
+                [row[0][:23] for row in data], dtype='datetime64[ms]'
+            ).astype(np.int64)
             
-            if result.get('code') != 0:
-                error_msg = result.get('desc', result.get('msg', 'Unknown error'))
-                logger.error(f"Query failed: {error_msg}")
-                return frames
+            if frame_ts_ms.size == 0:
+                logger.info("Matched 0/%s frames", len(timestamps_ms))
+                return frames, set(sorted_targets[answered_mask].tolist())
             
-            data = result.get('data', [])
-            logger.info(f"Batch query found {len(data)} frames")
+            # Match each requested timestamp to its closest row (earliest on
+            # ties), as query_frame_by_timestamp does. Rows arrive sorted by
+            # ts, so the candidates are the rows on either side of the
+            # target's insertion point; the left one is stepped back to the
+            # first of any run of equal timestamps
+            pos = np.searchsorted(frame_ts_ms, sorted_targets, side='left')
+            left = np.searchsorted(frame_ts_ms, frame_ts_ms[np.maximum(pos - 1, 0)], side='left')
+            right = np.minimum(pos, len(frame_ts_ms) - 1)
+            left_diff = np.abs(sorted_targets - frame_ts_ms[left])
+            right_diff = np.abs(frame_ts_ms[right] - sorted_targets)
+            use_left = left_diff <= right_diff
+            best_row = np.where(use_left, left, right)
+            within = np.where(use_left, left_diff, right_diff) <= tolerance_ms
+            matched_targets = sorted_targets[within]
+            matched_best = best_row[within]
+            matched_rows = np.unique(matched_best)
             
-            # Process each frame
-            for row in data:
-                frame_ts_str = row[0]
-                frame_data = row[1]
+            def decompress_row(row_idx: int) -> Optional[np.ndarray]:
+                # A corrupt payload only loses its own frame, not the batch
+                row = data[row_idx]
                 width = row[2] if len(row) > 2 else 60
                 height = row[3] if len(row) > 3 else 40
-                
-                # Parse timestamp (handle both formats: space and T separator)
-                frame_ts_clean = frame_ts_str[:23].replace('T', ' ')
-                frame_dt = datetime.strptime(frame_ts_clean, '%Y-%m-%d %H:%M:%S.%f')
-                frame_ts_ms = int(frame_dt.timestamp() * 1000)
-                
-                # Match to requested timestamps
-                for target_ts in timestamps_ms:
-                    if abs(frame_ts_ms - target_ts) <= tolerance_ms:
-                        # Decompress frame
-                        frame = self._decompress_frame_data(frame_data, width, height)
-                        frames[target_ts] = frame
-                        break
+                try:
+                    return self._decompress_frame_data(row[1], width, height)
+                except Exception as e:
+                    logger.warning("Skipping undecodable frame at %s: %s", row[0], e)
+                    return None
+            
+            # Decompress each matched row once on a thread pool (zlib releases
+            # the GIL); map() yields results in row order
+            num_workers = num_workers or os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                decoded = dict(zip(matched_rows.tolist(),
+                                   executor.map(decompress_row, matched_rows.tolist())))
             
-            logger.info(f"Matched {len(frames)}/{len(timestamps_ms)} frames")
-            return frames
+            # Targets sharing a row get their own copy, so editing one frame
+            # never changes another
+            used_rows = set()
+            for target_ts, row_idx in zip(matched_targets.tolist(), matched_best.tolist()):
+                frame = decoded[row_idx]
+                if frame is None:
+                    continue
+                frames[target_ts] = frame.copy() if row_idx in used_rows else frame
+                used_rows.add(row_idx)
+            
+            logger.info("Matched %s/%s frames", len(frames), len(timestamps_ms))
+            return frames, set(sorted_targets[answered_mask].tolist())
             
         except Exception as e:
-            logger.error(f"Batch query error: {e}")
-            return frames
+            logger.error("Batch query error: %s", e)
+            return frames, answered
 
 
 class ThermalAnnotationDataset(Dataset):
@@ -284,7 +441,9 @@ class ThermalAnnotationDataset(Dataset):
     def __init__(self, annotation_file: str, mac_address: str,
                  tdengine_config: Optional[Dict] = None,
                  transform=None, target_transform=None,
-                 cache_frames: bool = True):
+                 cache_frames: bool = True,
+                 persistent_cache_path: Optional[str] = None,
+                 quantize_cache: bool = False):
         """
         Initialize the dataset.
         
@@ -295,16 +454,32 @@ class ThermalAnnotationDataset(Dataset):
             transform: Optional transform to apply to frames
             target_transform: Optional transform to apply to annotations
             cache_frames: Whether to cache fetched frames in memory
+            persistent_cache_path: Optional .npy file holding prefetched frames
+                on disk; written by prefetch_all_frames and memory-mapped
+                read-only on later runs (shared by all DataLoader workers).
+                A cache written for another sensor or annotation file is
+                ignored and rewritten on the next prefetch
+            quantize_cache: Write the persistent cache as int16 deciKelvin
+                (half the size; lossless for int16 sensor data, 0.1 °C steps
+                for float32 payloads)
         """
         self.annotation_file = annotation_file
         self.mac_address = mac_address
         self.transform = transform
         self.target_transform = target_transform
         self.cache_frames = cache_frames
+        self.persistent_cache_path = persistent_cache_path
+        self.quantize_cache = quantize_cache
         
         # Load annotations from JSON file
         self.annotations = self._load_annotations()
         
+        # Columnar copy of the annotation timestamps (ms) for bulk operations
+        self.data_times = np.fromiter(
+            (ann['data_time'] for ann in self.annotations),
+            dtype=np.int64, count=len(self.annotations)
+        )
+        
         # Initialize TDengine connector
         tdengine_config = tdengine_config or {}
         self.tdengine = TDengineConnector(**tdengine_config)
@@ -312,50 +487,67 @@ class ThermalAnnotationDataset(Dataset):
         # Frame cache (in-memory)
         self.frame_cache = {} if cache_frames else None
         
+        # Persistent frame cache (on disk, memory-mapped): frames plus a map
+        # from timestamp to row
+        self._frame_store = None
+        self._frame_rows = {}
+        if persistent_cache_path is not None:
+            self._open_persistent_cache()
+        
+        # Prefetched frames packed as one (N, 1, H, W) tensor, one row per
+        # sample, with a mask of rows that hold a fetched frame
+        self._frame_tensor = None
+        self._frame_loaded = None
+        
         # Category mapping for labels
         self.category_to_id = {}
         self.id_to_category = {}
         self._build_category_mapping()
         
-        logger.info(f"Initialized ThermalAnnotationDataset:")
-        logger.info(f"  Annotation file: {annotation_file}")
-        logger.info(f"  MAC address: {mac_address}")
-        logger.info(f"  Total samples: {len(self.annotations)}")
-        logger.info(f"  Categories: {len(self.category_to_id)}")
-        logger.info(f"  Cache enabled: {cache_frames}")
+        # Annotations never change, so build every training target once,
+        # flattened into ragged box/label tensors (see _build_targets)
+        self._build_targets()
+        
+        logger.info("Initialized ThermalAnnotationDataset:")
+        logger.info("  Annotation file: %s", annotation_file)
+        logger.info("  MAC address: %s", mac_address)
+        logger.info("  Total samples: %s", len(self.annotations))
+        logger.info("  Categories: %s", len(self.category_to_id))
+        logger.info("  Cache enabled: %s", cache_frames)
     
     def _load_annotations(self) -> List[Dict]:
         """Load annotations from JSON file (one JSON object per line)."""
         annotations = []
         
-        with open(self.annotation_file, 'r') as f:
-            for line_num, line in enumerate(f, 1):
-                if line.strip():
-                    try:
-                        ann = json.loads(line.strip())
-                        annotations.append(ann)
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Failed to parse line {line_num}: {e}")
+        # One bulk read, then parse each line from bytes (orjson when
+        # available; it tolerates surrounding whitespace, as does json)
+        data = Path(self.annotation_file).read_bytes()
+        loads = orjson.loads if orjson is not None else json.loads
         
-        logger.info(f"Loaded {len(annotations)} annotations from {self.annotation_file}")
+        for line_num, line in enumerate(data.splitlines(), 1):
+            if line and not line.isspace():
+                try:
+                    annotations.append(loads(line))
+                except json.JSONDecodeError as e:  # orjson's error subclasses it
+                    logger.warning("Failed to parse line %s: %s", line_num, e)
+        
+        logger.info("Loaded %s annotations from %s", len(annotations), self.annotation_file)
         return annotations
     
     def _build_category_mapping(self):
         """Build category to ID mapping for classification tasks."""
-        next_id = 0
+        # Deduplicate in one pass; dict keys keep first-seen order, so IDs
+        # are assigned in the order categories appear in the file
+        full_categories = dict.fromkeys(
+            f"{obj.get('category', '')}/{obj.get('subcategory', '')}"
+            for ann in self.annotations
+            for obj in ann.get('annotations', [])
+        )
         
-        for ann in self.annotations:
-            for obj in ann.get('annotations', []):
-                category = obj.get('category', '')
-                subcategory = obj.get('subcategory', '')
-                full_category = f"{category}/{subcategory}"
-                
-                if full_category not in self.category_to_id:
-                    self.category_to_id[full_category] = next_id
-                    self.id_to_category[next_id] = full_category
-                    next_id += 1
+        self.category_to_id = {name: class_id for class_id, name in enumerate(full_categories)}
+        self.id_to_category = dict(enumerate(full_categories))
         
-        logger.info(f"Built category mapping with {len(self.category_to_id)} categories")
+        logger.info("Built category mapping with %s categories", len(self.category_to_id))
     
     def __len__(self) -> int:
         """
@@ -377,42 +569,43 @@ class ThermalAnnotationDataset(Dataset):
             - thermal_frame_tensor: torch.Tensor of shape (1, H, W) in Celsius
             - annotation_dict: Dict with bboxes, labels, and metadata
         """
-        if idx >= len(self.annotations):
+        # Negative indices count from the end, as for a list; the target
+        # offsets below need the normalized index
+        if idx < 0:
+            idx += len(self.annotations)
+        if not 0 <= idx < len(self.annotations):
             raise IndexError(f"Index {idx} out of range (0-{len(self.annotations)-1})")
         
         # Get annotation for this index
         annotation = self.annotations[idx]
         data_time_ms = annotation['data_time']  # Milliseconds
         
-        # Check cache first
-        if self.cache_frames and data_time_ms in self.frame_cache:
-            frame = self.frame_cache[data_time_ms]
+        if self._frame_tensor is not None and self._frame_loaded[idx]:
+            # Prefetched frames are rows of one packed tensor, already (1, H, W)
+            frame_tensor = self._frame_tensor[idx]
         else:
-            # Fetch frame from TDengine directly into memory
-            frame = self.tdengine.query_frame_by_timestamp(
-                self.mac_address,
-                data_time_ms,
-                tolerance_ms=100
-            )
+            frame = self._get_frame(data_time_ms)
             
-            if frame is None:
-                logger.warning(f"Frame not found for timestamp {data_time_ms}, using zeros")
-                frame = np.zeros((40, 60), dtype=np.float32)
-            
-            # Cache if enabled
-            if self.cache_frames:
-                self.frame_cache[data_time_ms] = frame
-        
-        # Convert numpy to torch tensor
-        # Add channel dimension: (H, W) → (1, H, W)
-        frame_tensor = torch.from_numpy(frame).unsqueeze(0)
+            # Convert numpy to torch tensor
+            # Add channel dimension: (H, W) → (1, H, W)
+            frame_tensor = torch.from_numpy(frame).unsqueeze(0)
         
-        # Apply transform if provided
+        # Apply transform if provided. The frame may be a row of the shared
+        # packed tensor or a cached array, so an in-place transform gets a
+        # private copy instead of editing the cache for every later access
         if self.transform:
-            frame_tensor = self.transform(frame_tensor)
+            frame_tensor = self.transform(frame_tensor.clone())
+        
+        # Training-format target built in __init__: boxes and labels are
+        # copied out of the flat shared tensors (a sample holds only a few
+        # boxes), so callers and target transforms may edit them in place
+        # without touching the dataset; metadata is copied into a fresh dict
+        start, end = self._target_offsets[idx], self._target_offsets[idx + 1]
+        boxes = self._target_boxes[start:end].clone()
+        labels = self._target_labels[start:end].clone()
         
-        # Process annotations into training format
-        target = self._process_annotation(annotation)
+        target = {'boxes': boxes, 'labels': labels}
+        target.update(self._target_meta[idx])
         
         # Apply target transform if provided
         if self.target_transform:
@@ -420,6 +613,109 @@ class ThermalAnnotationDataset(Dataset):
         
         return frame_tensor, target
     
+    def __getitems__(self, indices: List[int]) -> List[Tuple[torch.Tensor, Dict]]:
+        """
+        Get a batch of samples; DataLoader calls this once per batch.
+        
+        Frames that are not cached yet are fetched with a single batch query
+        instead of one TDengine query per sample.
+        
+        Args:
+            indices: Sample indices of the batch
+            
+        Returns:
+            List of (thermal_frame_tensor, annotation_dict) tuples
+        """
+        if self.cache_frames:
+            missing = [
+                ts for ts in dict.fromkeys(self.data_times[indices].tolist())
+                if ts not in self.frame_cache and ts not in self._frame_rows
+            ]
+            if missing:
+                frames, answered = self.tdengine._batch_query(self.mac_address, missing, tolerance_ms=100)
+                self.frame_cache.update(frames)
+                
+                # Timestamps the batch query answered without a frame have
+                # none in TDengine; cache the zero frame rather than asking
+                # again one sample at a time
+                for ts in answered.difference(frames):
+                    logger.warning("Frame not found for timestamp %s, using zeros", ts)
+                    self.frame_cache[ts] = np.zeros((40, 60), dtype=np.float32)
+        
+        # Only timestamps whose batch query failed fall back to per-sample lookup
+        return [self[idx] for idx in indices]
+    
+    def _get_frame(self, data_time_ms: int) -> np.ndarray:
+        """
+        Get a frame from the caches, or fetch it from TDengine.
+        
+        Args:
+            data_time_ms: Annotation timestamp in milliseconds
+            
+        Returns:
+            Thermal frame (H, W) in Celsius (zeros if not found)
+        """
+        # Check caches first
+        if self.cache_frames and data_time_ms in self.frame_cache:
+            return self.frame_cache[data_time_ms]
+        
+        if data_time_ms in self._frame_rows:
+            row = self._frame_store[self._frame_rows[data_time_ms]]
+            if row.dtype == np.int16:
+                # Quantized cache: decode the deciKelvin codes to Celsius
+                return _DECIKELVIN_TO_CELSIUS.take(row.view(np.uint16))
+            # Copy the row out of the read-only memory map
+            return np.array(row)
+        
+        # Fetch frame from TDengine directly into memory
+        frame = self.tdengine.query_frame_by_timestamp(
+            self.mac_address,
+            data_time_ms,
+            tolerance_ms=100
+        )
+        
+        if frame is None:
+            logger.warning("Frame not found for timestamp %s, using zeros", data_time_ms)
+            frame = np.zeros((40, 60), dtype=np.float32)
+        
+        # Cache if enabled
+        if self.cache_frames:
+            self.frame_cache[data_time_ms] = frame
+        
+        return frame
+    
+    def _build_targets(self):
+        """
+        Flatten all training targets into ragged tensors.
+        
+        Boxes and labels of every sample are concatenated into one (sum_N, 4)
+        and one (sum_N,) tensor; sample idx owns rows
+        _target_offsets[idx]:_target_offsets[idx + 1]. The remaining keys are
+        kept per sample in _target_meta.
+        """
+        targets = [self._process_annotation(ann) for ann in self.annotations]
+        
+        offsets = [0]
+        for target in targets:
+            offsets.append(offsets[-1] + len(target['labels']))
+        self._target_offsets = offsets
+        
+        # Two shared-memory tensors instead of one small pair per sample, so
+        # DataLoader workers (fork or spawn) share them; __getitem__ copies
+        # each sample's rows out (the leading empty tensor keeps torch.cat
+        # valid for an empty dataset)
+        self._target_boxes = torch.cat(
+            [torch.zeros((0, 4), dtype=torch.float32)] + [t['boxes'] for t in targets]
+        ).share_memory_()
+        self._target_labels = torch.cat(
+            [torch.zeros((0,), dtype=torch.int64)] + [t['labels'] for t in targets]
+        ).share_memory_()
+        
+        self._target_meta = [
+            {key: value for key, value in target.items() if key not in ('boxes', 'labels')}
+            for target in targets
+        ]
+    
     def _process_annotation(self, annotation: Dict) -> Dict:
         """
         Process annotation into training-ready format.
@@ -441,26 +737,24 @@ class ThermalAnnotationDataset(Dataset):
                 'timestamp': annotation.get('data_time', 0),
             }
         
-        # Extract bboxes and labels
-        boxes = []
-        labels = []
+        # Keep only well-formed boxes; they are already in YOLO format
+        # [cx, cy, w, h], so they convert to an array in one call
+        valid = [obj for obj in objects if len(obj.get('bbox', [])) == 4]
         
-        for obj in objects:
-            bbox = obj.get('bbox', [])
-            category = obj.get('category', '')
-            subcategory = obj.get('subcategory', '')
-            
-            if len(bbox) == 4:
-                boxes.append(bbox)  # Already in YOLO format [cx, cy, w, h]
-                
-                # Get category ID
-                full_category = f"{category}/{subcategory}"
-                label_id = self.category_to_id.get(full_category, 0)
-                labels.append(label_id)
+        # Every category was registered up front by _build_category_mapping,
+        # so a direct dict read is always a hit
+        category_to_id = self.category_to_id
+        
+        boxes = np.asarray([obj['bbox'] for obj in valid], dtype=np.float32).reshape(-1, 4)
+        labels = np.fromiter(
+            (category_to_id[f"{obj.get('category', '')}/{obj.get('subcategory', '')}"]
+             for obj in valid),
+            dtype=np.int64, count=len(valid)
+        )
         
-        # Convert to tensors
-        boxes_tensor = torch.tensor(boxes, dtype=torch.float32)
-        labels_tensor = torch.tensor(labels, dtype=torch.int64)
+        # Convert to tensors (zero-copy from the numpy arrays)
+        boxes_tensor = torch.from_numpy(boxes)
+        labels_tensor = torch.from_numpy(labels)
         
         return {
             'boxes': boxes_tensor,  # Shape: (N, 4) - YOLO format
@@ -478,15 +772,22 @@ class ThermalAnnotationDataset(Dataset):
         """
         Prefetch all frames from TDengine into memory cache.
         Useful for training to avoid repeated network queries.
+        
+        With a persistent cache path the frames are also written to disk, and
+        an existing persistent cache is used instead of querying again.
         """
-        if not self.cache_frames:
+        if self._frame_store is not None:
+            logger.info("Using persistent frame cache %s (%s frames), skipping prefetch",
+                        self.persistent_cache_path, len(self._frame_rows))
+            return
+        
+        if not self.cache_frames and self.persistent_cache_path is None:
             logger.warning("Cache is disabled, prefetch has no effect")
             return
         
-        logger.info(f"Prefetching {len(self.annotations)} frames...")
+        logger.info("Prefetching %s frames...", len(self.annotations))
         
-        # Collect all timestamps
-        timestamps = [ann['data_time'] for ann in self.annotations]
+        timestamps = self.data_times
         
         # Batch query for efficiency
         frames = self.tdengine.batch_query_frames(
@@ -495,11 +796,196 @@ class ThermalAnnotationDataset(Dataset):
             tolerance_ms=100
         )
         
-        # Update cache
-        self.frame_cache.update(frames)
+        # Update caches
+        if self.cache_frames:
+            self.frame_cache.update(frames)
+            self._build_frame_tensor()
+        if self.persistent_cache_path is not None:
+            self._write_persistent_cache(frames)
+        
+        logger.info("Prefetched %s frames into cache", len(frames))
+        logger.info("Cache hit rate will be: %s/%s (%.1f%%)", len(frames), len(timestamps), len(frames)/len(timestamps)*100)
+    
+    def _build_frame_tensor(self):
+        """
+        Pack the cached frames into one contiguous (N, 1, H, W) tensor so
+        __getitem__ returns a row view instead of building a new tensor.
+        """
+        data_times = self.data_times.tolist()
+        frame_loaded = np.array([ts in self.frame_cache for ts in data_times], dtype=bool)
+        loaded_rows = np.flatnonzero(frame_loaded)
+        
+        # The tensor takes its frame size from the sensor data; frames of
+        # differing sizes stay in the dict cache unpacked
+        frame_shape = self._common_frame_shape(
+            self.frame_cache[data_times[row]] for row in loaded_rows
+        )
+        if frame_shape is None:
+            if len(loaded_rows) > 0:
+                logger.warning("Cached frames differ in shape, keeping them unpacked")
+            self._frame_tensor = None
+            self._frame_loaded = None
+            return
+        
+        # Allocate in shared memory so DataLoader workers (fork or spawn) all
+        # read the same pages instead of holding their own copy
+        frame_tensor = torch.zeros((len(data_times), 1) + frame_shape, dtype=torch.float32).share_memory_()
+        frame_array = frame_tensor.numpy()
+        
+        for row in loaded_rows:
+            frame_array[row, 0] = self.frame_cache[data_times[row]]
+        
+        self._frame_tensor = frame_tensor
+        self._frame_loaded = frame_loaded
+        self._link_frame_cache()
+    
+    @staticmethod
+    def _common_frame_shape(frames) -> Optional[Tuple[int, ...]]:
+        """
+        Shape shared by all frames.
+        
+        Args:
+            frames: Iterable of frame arrays
+            
+        Returns:
+            The common shape, or None if there are no frames or sizes differ
+        """
+        shapes = {frame.shape for frame in frames}
+        return shapes.pop() if len(shapes) == 1 else None
+    
+    def _link_frame_cache(self):
+        """Point the dict cache at the packed tensor rows so each frame is held once."""
+        frame_array = self._frame_tensor.numpy()
+        data_times = self.data_times.tolist()
+        for row in np.flatnonzero(self._frame_loaded):
+            self.frame_cache[data_times[row]] = frame_array[row, 0]
+    
+    def __getstate__(self) -> Dict:
+        """
+        Pickle state for spawned DataLoader workers without copying frames.
+        
+        The packed tensor travels as a shared-memory handle, so the dict
+        entries pointing into it are dropped and relinked on unpickling; the
+        persistent cache is reopened rather than copied out of its mapping.
+        """
+        state = self.__dict__.copy()
+        if self._frame_tensor is not None:
+            packed = set(self.data_times[self._frame_loaded].tolist())
+            state['frame_cache'] = {
+                ts: frame for ts, frame in self.frame_cache.items() if ts not in packed
+            }
+        state['_frame_store'] = None
+        state['_frame_rows'] = {}
+        return state
+    
+    def __setstate__(self, state: Dict):
+        """Restore pickled state (see __getstate__)."""
+        self.__dict__.update(state)
+        if self._frame_tensor is not None:
+            self._link_frame_cache()
+        if self.persistent_cache_path is not None:
+            self._open_persistent_cache()
+    
+    def _persistent_index_path(self) -> Path:
+        """Sidecar file describing the persistent cache rows and their source."""
+        cache_path = Path(self.persistent_cache_path)
+        return cache_path.with_name(f"{cache_path.stem}_index.npz")
+    
+    def _open_persistent_cache(self):
+        """Memory-map an existing persistent frame cache, if present and ours."""
+        cache_path = Path(self.persistent_cache_path)
+        index_path = self._persistent_index_path()
+        
+        if not (cache_path.exists() and index_path.exists()):
+            return
+        
+        with np.load(index_path) as index:
+            mac_address = str(index['mac_address'])
+            data_times = index['data_times']
+            loaded = index['loaded']
+            frame_shape = tuple(index['frame_shape'].tolist())
+        store = np.load(cache_path, mmap_mode='r')
+        
+        # A cache written for another sensor or annotation file (or a
+        # mismatched frame file) would serve the wrong frames; ignore it so
+        # the next prefetch rewrites it
+        if (mac_address != self.mac_address
+                or not np.array_equal(data_times, self.data_times)
+                or store.shape != (len(data_times),) + frame_shape):
+            logger.warning("Persistent frame cache %s does not match this dataset, ignoring it",
+                           cache_path)
+            return
+        
+        self._frame_store = store
+        self._frame_rows = {
+            ts: row for row, ts in enumerate(data_times.tolist()) if loaded[row]
+        }
+        
+        logger.info("Opened persistent frame cache %s (%s frames)", cache_path, len(self._frame_rows))
+    
+    def _write_persistent_cache(self, frames: Dict[int, np.ndarray]):
+        """
+        Write prefetched frames to the persistent cache, one row per sample.
+        
+        Both files are written to temporary paths and renamed into place, so
+        an interrupted write never leaves a cache that looks valid.
+        
+        Args:
+            frames: Dictionary mapping timestamp_ms to frame arrays
+        """
+        cache_path = Path(self.persistent_cache_path)
+        
+        # One array holds every row, so all frames must share a size
+        frame_shape = self._common_frame_shape(frames.values())
+        if frame_shape is None:
+            if frames:
+                logger.warning("Fetched frames differ in shape, not writing persistent cache %s",
+                               cache_path)
+            return
+        
+        index_path = self._persistent_index_path()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_tmp = cache_path.with_name(f".{cache_path.name}.tmp")
+        index_tmp = index_path.with_name(f".{index_path.name}.tmp")
+        
+        try:
+            store = np.lib.format.open_memmap(
+                cache_tmp, mode='w+',
+                dtype=np.int16 if self.quantize_cache else np.float32,
+                shape=(len(self.annotations),) + frame_shape
+            )
+            loaded = np.zeros(len(self.annotations), dtype=bool)
+            
+            for row, data_time_ms in enumerate(self.data_times.tolist()):
+                frame = frames.get(data_time_ms)
+                if frame is not None:
+                    if self.quantize_cache:
+                        # Celsius back to deciKelvin (float64 math, exact for
+                        # frames that were decoded from int16)
+                        frame = np.rint((frame.astype(np.float64) + 273.15) * 10.0).astype(np.int16)
+                    store[row] = frame
+                    loaded[row] = True
+            
+            store.flush()
+            del store
+            
+            with open(index_tmp, 'wb') as f:
+                np.savez(f, mac_address=np.str_(self.mac_address), data_times=self.data_times,
+                         loaded=loaded, frame_shape=np.array(frame_shape, dtype=np.int64))
+            
+            # Drop the old index first: the frames file is only ever read
+            # through an index written alongside it
+            index_path.unlink(missing_ok=True)
+            os.replace(cache_tmp, cache_path)
+            os.replace(index_tmp, index_path)
+        finally:
+            cache_tmp.unlink(missing_ok=True)
+            index_tmp.unlink(missing_ok=True)
+        
+        logger.info("Wrote persistent frame cache: %s", cache_path)
         
-        logger.info(f"Prefetched {len(frames)} frames into cache")
-        logger.info(f"Cache hit rate will be: {len(frames)}/{len(timestamps)} ({len(frames)/len(timestamps)*100:.1f}%)")
+        # Serve later lookups from the read-only mapping
+        self._open_persistent_cache()
     
     def get_statistics(self) -> Dict:
         """Get dataset statistics."""
@@ -510,6 +996,7 @@ class ThermalAnnotationDataset(Dataset):
             'mac_address': self.mac_address,
             'cache_size': len(self.frame_cache) if self.cache_frames else 0,
             'cached_frames': list(self.frame_cache.keys()) if self.cache_frames else [],
+            'persistent_cache_size': len(self._frame_rows),
         }
 
 
@@ -517,6 +1004,8 @@ def create_dataloader(annotation_file: str, mac_address: str,
                      batch_size: int = 8, shuffle: bool = True,
                      num_workers: int = 0, prefetch: bool = True,
                      tdengine_config: Optional[Dict] = None,
+                     persistent_cache_path: Optional[str] = None,
+                     quantize_cache: bool = False,
                      **dataloader_kwargs) -> DataLoader:
     """
     Create a PyTorch DataLoader for thermal annotation data.
@@ -529,6 +1018,9 @@ def create_dataloader(annotation_file: str, mac_address: str,
         num_workers: Number of worker processes
         prefetch: Whether to prefetch all frames before training
         tdengine_config: Optional TDengine connection config
+        persistent_cache_path: Optional .npy file for an on-disk frame cache
+            that survives restarts (see ThermalAnnotationDataset)
+        quantize_cache: Store the persistent cache as int16 deciKelvin
         **dataloader_kwargs: Additional arguments for DataLoader
         
     Returns:
@@ -552,7 +1044,9 @@ def create_dataloader(annotation_file: str, mac_address: str,
         annotation_file=annotation_file,
         mac_address=mac_address,
         tdengine_config=tdengine_config,
-        cache_frames=True  # Always enable cache for training
+        cache_frames=True,  # Always enable cache for training
+        persistent_cache_path=persistent_cache_path,
+        quantize_cache=quantize_cache
     )
     
     # Prefetch all frames if requested
@@ -570,11 +1064,11 @@ def create_dataloader(annotation_file: str, mac_address: str,
         **dataloader_kwargs
     )
     
-    logger.info(f"Created DataLoader:")
-    logger.info(f"  Batch size: {batch_size}")
-    logger.info(f"  Shuffle: {shuffle}")
-    logger.info(f"  Num workers: {num_workers}")
-    logger.info(f"  Total batches: {len(dataloader)}")
+    logger.info("Created DataLoader:")
+    logger.info("  Batch size: %s", batch_size)
+    logger.info("  Shuffle: %s", shuffle)
+    logger.info("  Num workers: %s", num_workers)
+    logger.info("  Total batches: %s", len(dataloader))
     
     return dataloader
 
@@ -591,15 +1085,19 @@ def collate_fn(batch: List[Tuple[torch.Tensor, Dict]]) -> Tuple[torch.Tensor, Li
         - batched_frames: (batch_size, 1, H, W)
         - list_of_targets: List of target dicts (varies by sample)
     """
-    frames = []
-    targets = []
+    frames, targets = zip(*batch)
     
-    for frame, target in batch:
-        frames.append(frame)
-        targets.append(target)
+    # Inside a DataLoader worker, stack straight into shared memory (as
+    # torch's default_collate does) so handing the batch to the main
+    # process does not copy it again
+    out = None
+    if torch.utils.data.get_worker_info() is not None:
+        numel = sum(frame.numel() for frame in frames)
+        storage = frames[0]._typed_storage()._new_shared(numel, device=frames[0].device)
+        out = frames[0].new(storage).resize_(len(frames), *frames[0].shape)
     
     # Stack frames into batch
-    frames_batch = torch.stack(frames, dim=0)
+    frames_batch = torch.stack(frames, dim=0, out=out)
     
-    return frames_batch, targets
+    return frames_batch, list(targets)
 
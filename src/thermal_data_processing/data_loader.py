@@ -6,6 +6,8 @@ Handles loading thermal data from various file formats.
 
 import numpy as np
 import logging
+import mmap
+import os
 import re
 from pathlib import Path
 from typing import Union, Tuple, List, Optional
@@ -13,6 +15,56 @@ from abc import ABC, abstractmethod
 
 logger = logging.getLogger(__name__)
 
+# Timestamp pattern used by the text-file parser, compiled once at import
+_TIMESTAMP_RE = re.compile(rb't:\s*([\d.]+)')
+
+# Lookup tables from every 5-digit deciKelvin token to float32 Kelvin and
+# Celsius, so a frame converts with one gather. The Celsius table repeats the
+# float32 subtraction, matching a Kelvin frame minus 273.15 bit for bit
+_DECIKELVIN_TO_KELVIN = (np.arange(100000) / 10.0).astype(np.float32)
+_DECIKELVIN_TO_CELSIUS = _DECIKELVIN_TO_KELVIN - np.float32(273.15)
+
+
+def _parse_decikelvin_tokens(line: bytes) -> np.ndarray:
+    """
+    Extract every standalone 5-digit number from a line of bytes.
+    
+    A token is a maximal run of ASCII digits; runs of exactly five digits
+    are deciKelvin values. The runs are located and decoded with whole-line
+    array operations rather than per-token Python work.
+    
+    Args:
+        line: Raw line bytes
+        
+    Returns:
+        int32 array of the values, in line order
+    """
+    digits = np.frombuffer(line, dtype=np.uint8) - np.uint8(48)
+    
+    # Digit mask padded with a zero on each side, so its nonzero diffs
+    # alternate run start, run end
+    is_digit = np.zeros(len(digits) + 2, dtype=np.int8)
+    np.less(digits, 10, out=is_digit[1:-1].view(bool))
+    edges = np.flatnonzero(np.diff(is_digit))
+    starts = edges[0::2]
+    ends = edges[1::2]
+    starts = starts[ends - starts == 5]
+    
+    digits = digits.astype(np.int32)
+    return ((((digits[starts] * 10 + digits[starts + 1]) * 10
+              + digits[starts + 2]) * 10 + digits[starts + 3]) * 10
+            + digits[starts + 4])
+
+
+def _iter_file_lines(file_path: str):
+    """Yield the lines of a file as bytes, read through a read-only memory map."""
+    with open(file_path, 'rb') as f:
+        # mmap cannot map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter(mm.readline, b'')
+
 
 class ThermalDataLoader:
     """
@@ -34,84 +86,116 @@ class ThermalDataLoader:
         self.target_shape = target_shape
         self.height, self.width = target_shape
         
-        logger.info(f"Initialized thermal data loader for {self.width}x{self.height} frames")
+        logger.info("Initialized thermal data loader for %sx%s frames", self.width, self.height)
     
-    def load_from_text_file(self, file_path: str) -> Tuple[np.ndarray, List[float]]:
+    def load_from_text_file(self, file_path: str,
+                            to_celsius: bool = False,
+                            raw_decikelvin: bool = False) -> Tuple[np.ndarray, np.ndarray]:
         """
         Load thermal data from text file (deciKelvin format).
         
         Args:
             file_path: Path to text file
+            to_celsius: Return frames in Celsius instead of Kelvin (converted
+                per frame while parsing, so no extra pass over the stack)
+            raw_decikelvin: Return the raw deciKelvin values as uint16 (half
+                the memory of float32) and leave the conversion to the
+                caller, e.g. frames / 10.0 for Kelvin
             
         Returns:
-            Tuple of (frames_array, timestamps)
+            Tuple of (frames_array, timestamps), frames as float32 (uint16
+            with raw_decikelvin) and timestamps as a float64 array
         """
-        logger.info(f"Loading thermal data from text file: {file_path}")
+        if to_celsius and raw_decikelvin:
+            raise ValueError("to_celsius and raw_decikelvin are mutually exclusive")
         
-        frames = []
+        logger.info("Loading thermal data from text file: %s", file_path)
+        
+        num_pixels = self.height * self.width
         timestamps = []
         
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
+        # Allocate the output once. A frame line holds num_pixels 5-digit
+        # tokens with a separator between each, so the file size bounds the
+        # number of frames; parsed frames are written straight into it
+        max_frames = os.path.getsize(file_path) // (6 * num_pixels - 1)
+        frames_array = np.empty((max_frames, *self.target_shape),
+                                dtype=np.uint16 if raw_decikelvin else np.float32)
+        num_frames = 0
         
-        logger.info(f"Total lines in file: {len(lines)}")
+        # Stream the file as bytes from a memory map instead of building a
+        # list of decoded lines up front
+        lines = _iter_file_lines(file_path)
+        header = next(lines, None)  # Skip header
+        num_lines = 0 if header is None else 1
         
         # Parse each frame
-        for line_idx, line in enumerate(lines[1:], 1):  # Skip header
-            line = line.strip()
-            if not line:
+        for line in lines:
+            num_lines += 1
+            # Blank lines carry nothing; other lines are parsed as-is since
+            # the timestamp pattern and token scan below ignore surrounding whitespace
+            if line.isspace():
                 continue
             
             # Extract timestamp if present
-            timestamp_match = re.search(r't:\s*([\d.]+)', line)
+            timestamp_match = _TIMESTAMP_RE.search(line)
             if timestamp_match:
                 timestamp = float(timestamp_match.group(1))
                 timestamps.append(timestamp)
-                line = re.sub(r't:\s*[\d.]+', '', line)
-            
-            # Extract temperature values
-            temp_values = []
-            clean_line = re.sub(r'[^\d\s]', ' ', line)
-            parts = clean_line.split()
+                line = _TIMESTAMP_RE.sub(b'', line)
             
-            for part in parts:
-                if len(part) == 5 and part.isdigit():
-                    # Convert from deciKelvin to Kelvin
-                    temp_k = int(part) / 10.0
-                    temp_values.append(temp_k)
+            # Extract temperature values (5-digit deciKelvin tokens)
+            temp_values = _parse_decikelvin_tokens(line)
             
             # Create frame if we have enough values
-            if len(temp_values) >= self.height * self.width:
-                thermal_values = temp_values[:self.height * self.width]
-                frame = np.array(thermal_values, dtype=np.float32).reshape(self.target_shape)
+            if len(temp_values) >= num_pixels:
+                values = temp_values[:num_pixels].reshape(self.target_shape)
+                frame = frames_array[num_frames]
+                if raw_decikelvin:
+                    # Keep deciKelvin as-is; 5-digit tokens can exceed uint16
+                    if values.max() > np.iinfo(np.uint16).max:
+                        raise ValueError(f"deciKelvin value out of uint16 range in {file_path}")
+                    frame[...] = values
+                else:
+                    # Convert from deciKelvin into the next output row
+                    lut = _DECIKELVIN_TO_CELSIUS if to_celsius else _DECIKELVIN_TO_KELVIN
+                    lut.take(values, out=frame)
                 # Flip left-right to correct image orientation
                 # frame = np.fliplr(frame)
-                frames.append(frame)
+                num_frames += 1
         
-        frames_array = np.array(frames)
-        logger.info(f"Loaded {len(frames)} frames from text file")
+        logger.info("Total lines in file: %s", num_lines)
         
-        if len(frames) > 0:
-            logger.info(f"Temperature range: {np.min(frames_array):.1f}K to {np.max(frames_array):.1f}K")
+        frames_array = frames_array[:num_frames]
+        logger.info("Loaded %s frames from text file", num_frames)
         
-        return frames_array, timestamps
+        # The range costs two passes over the whole stack; skip them when the
+        # message would be dropped anyway
+        if num_frames > 0 and logger.isEnabledFor(logging.INFO):
+            unit = "°C" if to_celsius else "dK" if raw_decikelvin else "K"
+            logger.info("Temperature range: %.1f%s to %.1f%s", np.min(frames_array), unit, np.max(frames_array), unit)
+        
+        return frames_array, np.asarray(timestamps, dtype=np.float64)
     
-    def load_from_numpy(self, file_path: str) -> np.ndarray:
+    def load_from_numpy(self, file_path: str, use_mmap: bool = False) -> np.ndarray:
         """
         Load thermal data from NumPy file.
         
         Args:
             file_path: Path to .npy or .npz file
+            use_mmap: Memory-map .npy files copy-on-write instead of reading
+                them into RAM; frames are paged in as they are accessed, and
+                in-place edits stay in memory without touching the file. .npz
+                files are always read fully (their members are compressed)
             
         Returns:
-            Thermal frames array
+            Thermal frames array (a memmap view for .npy with use_mmap)
         """
-        logger.info(f"Loading thermal data from NumPy file: {file_path}")
+        logger.info("Loading thermal data from NumPy file: %s", file_path)
         
         file_path = Path(file_path)
         
         if file_path.suffix == '.npy':
-            data = np.load(file_path)
+            data = np.load(file_path, mmap_mode='c' if use_mmap else None)
         elif file_path.suffix == '.npz':
             npz_data = np.load(file_path)
             # Try common keys
@@ -130,7 +214,7 @@ class ThermalDataLoader:
         elif len(data.shape) != 3:
             raise ValueError(f"Expected 2D or 3D array, got shape {data.shape}")
         
-        logger.info(f"Loaded {len(data)} frames from NumPy file")
+        logger.info("Loaded %s frames from NumPy file", len(data))
         return data
     
     def load_from_csv(self, file_path: str) -> np.ndarray:
@@ -143,12 +227,12 @@ class ThermalDataLoader:
         Returns:
             Single thermal frame
         """
-        logger.info(f"Loading thermal data from CSV file: {file_path}")
+        logger.info("Loading thermal data from CSV file: %s", file_path)
         
         data = np.loadtxt(file_path, delimiter=',')
         
         if data.shape != self.target_shape:
-            logger.warning(f"CSV shape {data.shape} != expected {self.target_shape}, reshaping...")
+            logger.warning("CSV shape %s != expected %s, reshaping...", data.shape, self.target_shape)
             if data.size == self.height * self.width:
                 data = data.reshape(self.target_shape)
             else:
@@ -160,15 +244,17 @@ class ThermalDataLoader:
         logger.info("Loaded single frame from CSV file")
         return data
     
-    def load_thermal_data(self, file_path: str) -> Tuple[np.ndarray, Optional[List[float]]]:
+    def load_thermal_data(self, file_path: str,
+                          use_mmap: bool = False) -> Tuple[np.ndarray, Optional[np.ndarray]]:
         """
         Load thermal data from any supported format.
         
         Args:
             file_path: Path to thermal data file
+            use_mmap: Memory-map .npy files (see load_from_numpy)
             
         Returns:
-            Tuple of (frames_array, timestamps_or_None)
+            Tuple of (frames_array, timestamps_or_None), timestamps as float64
         """
         file_path = Path(file_path)
         
@@ -179,9 +265,16 @@ class ThermalDataLoader:
         
         if extension == '.txt':
             return self.load_from_text_file(str(file_path))
-        elif extension in ['.npy', '.npz']:
-            frames = self.load_from_numpy(str(file_path))
+        elif extension == '.npy':
+            frames = self.load_from_numpy(str(file_path), use_mmap=use_mmap)
             return frames, None
+        elif extension == '.npz':
+            frames = self.load_from_numpy(str(file_path))
+            # Timestamps stored alongside the frames (see save_thermal_data)
+            # come back as-is, without re-parsing the original text export
+            with np.load(file_path) as npz_data:
+                timestamps = npz_data['timestamps'] if 'timestamps' in npz_data else None
+            return frames, timestamps
         elif extension == '.csv':
             frames = self.load_from_csv(str(file_path))
             return frames, None
@@ -189,7 +282,8 @@ class ThermalDataLoader:
             raise ValueError(f"Unsupported file format: {extension}")
     
     def save_thermal_data(self, frames: np.ndarray, file_path: str, 
-                         file_format: str = None) -> None:
+                         file_format: str = None,
+                         timestamps: Optional[List[float]] = None) -> None:
         """
         Save thermal data to file.
         
@@ -197,16 +291,34 @@ class ThermalDataLoader:
             frames: Thermal frames to save
             file_path: Output file path
             file_format: File format ('npy', 'npz', 'csv'). If None, inferred from extension
+            timestamps: Optional frame timestamps, stored as float64 (npz only)
         """
         file_path = Path(file_path)
         
         if file_format is None:
             file_format = file_path.suffix[1:].lower()
         
-        if file_format == 'npy':
-            np.save(file_path, frames)
-        elif file_format == 'npz':
-            np.savez_compressed(file_path, data=frames)
+        if file_format in ('npy', 'npz'):
+            # np.save/np.savez append the extension when it is missing
+            if file_path.suffix != f'.{file_format}':
+                file_path = file_path.with_name(f"{file_path.name}.{file_format}")
+            
+            # Write to a temporary file and rename it over the target, so
+            # frames memory-mapped from the target (load_from_numpy with
+            # use_mmap) stay readable while the new file is written
+            tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    if file_format == 'npy':
+                        np.save(f, frames)
+                    elif timestamps is not None:
+                        np.savez_compressed(f, data=frames,
+                                            timestamps=np.asarray(timestamps, dtype=np.float64))
+                    else:
+                        np.savez_compressed(f, data=frames)
+                os.replace(tmp_path, file_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
         elif file_format == 'csv':
             if len(frames.shape) == 3 and frames.shape[0] == 1:
                 np.savetxt(file_path, frames[0], delimiter=',')
@@ -215,4 +327,7 @@ class ThermalDataLoader:
         else:
             raise ValueError(f"Unsupported file format: {file_format}")
         
-        logger.info(f"Saved {len(frames)} frames to: {file_path}")
+        if timestamps is not None and file_format != 'npz':
+            logger.warning("Timestamps are only stored in npz files; not saved to %s", file_path)
+        
+        logger.info("Saved %s frames to: %s", len(frames), file_path)
@@ -9,6 +9,11 @@ from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 from src.thermal_data_processing.data_loader import ThermalDataLoader as BaseThermalLoader
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,11 +28,26 @@ class ThermalDataLoader:
             target_shape: Expected frame shape (height, width)
         """
         self.loader = BaseThermalLoader(target_shape=target_shape)
-        self.frames = None
         self.timestamps = None
         self.frames_celsius = None
+        # Kelvin frames, derived from frames_celsius on first access
+        self._frames_kelvin = None
+    
+    @property
+    def frames(self) -> Optional[np.ndarray]:
+        """
+        Loaded frames in Kelvin, the text-file unit.
+        
+        Frames are loaded in Celsius (frames_celsius); the Kelvin stack is
+        computed from them on first access and kept, so code that only
+        visualizes never holds both. Values can differ from a direct Kelvin
+        parse in the last float32 bit.
+        """
+        if self._frames_kelvin is None and self.frames_celsius is not None:
+            self._frames_kelvin = self.frames_celsius + np.float32(273.15)
+        return self._frames_kelvin
     
-    def load(self, data_path: str) -> Tuple[np.ndarray, List[float]]:
+    def load(self, data_path: str) -> Tuple[np.ndarray, np.ndarray]:
         """
         Load thermal data from file.
         
@@ -37,16 +57,17 @@ class ThermalDataLoader:
         Returns:
             Tuple of (frames_celsius, timestamps)
         """
-        logger.info(f"Loading thermal data from {data_path}")
+        logger.info("Loading thermal data from %s", data_path)
         
-        # Load frames in Kelvin
-        self.frames, self.timestamps = self.loader.load_from_text_file(data_path)
+        # Load frames directly in Celsius for visualization; the conversion
+        # happens per frame during parsing, so there is no whole-stack pass
+        self.frames_celsius, self.timestamps = self.loader.load_from_text_file(
+            data_path, to_celsius=True
+        )
+        self._frames_kelvin = None
         
-        # Convert to Celsius for visualization
-        self.frames_celsius = self.frames - 273.15
-        
-        logger.info(f"Loaded {len(self.frames)} frames")
-        logger.info(f"Temperature range: {np.min(self.frames_celsius):.1f}°C to {np.max(self.frames_celsius):.1f}°C")
+        # The base loader already logged the Celsius temperature range
+        logger.info("Loaded %s frames", len(self.frames_celsius))
         
         return self.frames_celsius, self.timestamps
     
@@ -88,6 +109,18 @@ class AnnotationLoader:
         self.category_to_id = {}
         self.id_to_category = {}
         self.next_id = 0
+        
+        # Columnar views of the annotations: one timestamp (ms) per
+        # annotation and one category ID per object, in file order
+        self.data_times = np.empty(0, dtype=np.int64)
+        self.object_category_ids = np.empty(0, dtype=np.int64)
+        
+        # Annotation timestamps (ms) sorted ascending, and the matching
+        # indices into self.annotations, for binary-search frame matching
+        self._sorted_times = np.empty(0, dtype=np.int64)
+        self._sorted_order = np.empty(0, dtype=np.int64)
+        # Exact timestamp (ms) -> annotation index, for the common aligned case
+        self._time_to_index = {}
     
     def load(self, annotation_path: str) -> List[Dict]:
         """
@@ -99,26 +132,54 @@ class AnnotationLoader:
         Returns:
             List of annotation dictionaries
         """
-        logger.info(f"Loading annotations from {annotation_path}")
+        logger.info("Loading annotations from %s", annotation_path)
+        
+        loads = orjson.loads if orjson is not None else json.loads
         
         self.annotations = []
-        with open(annotation_path, 'r') as f:
+        data_times = []
+        object_category_ids = []
+        
+        # Stream the file line by line as bytes and parse each record
+        # (orjson when available, stdlib json otherwise); only the decoded
+        # annotations and their columns are kept, never the raw file
+        with open(annotation_path, 'rb') as f:
             for line in f:
-                if line.strip():
-                    ann = json.loads(line.strip())
-                    self.annotations.append(ann)
-                    
-                    # Build category mapping
-                    for obj in ann.get('annotations', []):
-                        category = obj.get('category', '')
-                        subcategory = obj.get('subcategory', '')
-                        self._register_category(category, subcategory)
-        
-        logger.info(f"Loaded {len(self.annotations)} annotations")
-        logger.info(f"Found {len(self.category_to_id)} unique categories")
+                if line.isspace():
+                    continue
+                
+                ann = loads(line)
+                self.annotations.append(ann)
+                data_times.append(ann['data_time'])
+                
+                # Build category mapping and the per-object category column
+                for obj in ann.get('annotations', []):
+                    category = obj.get('category', '')
+                    subcategory = obj.get('subcategory', '')
+                    object_category_ids.append(self._register_category(category, subcategory))
+        
+        self.data_times = np.asarray(data_times, dtype=np.int64)
+        self.object_category_ids = np.asarray(object_category_ids, dtype=np.int64)
+        
+        self._build_time_index()
+        
+        logger.info("Loaded %s annotations", len(self.annotations))
+        logger.info("Found %s unique categories", len(self.category_to_id))
         
         return self.annotations
     
+    def _build_time_index(self):
+        """Sort annotation timestamps once so frame lookups are O(log N)."""
+        # Stable sort keeps file order for annotations sharing a timestamp
+        self._sorted_order = np.argsort(self.data_times, kind='stable')
+        self._sorted_times = self.data_times[self._sorted_order]
+        
+        # First annotation in the file wins on duplicate timestamps, as in
+        # the search
+        self._time_to_index = {}
+        for idx, data_time in enumerate(self.data_times.tolist()):
+            self._time_to_index.setdefault(data_time, idx)
+    
     def _register_category(self, category: str, subcategory: str) -> int:
         """
         Register a category and get its ID.
@@ -172,22 +233,79 @@ class AnnotationLoader:
         frame_timestamp = timestamps[frame_idx]
         frame_timestamp_ms = int(frame_timestamp * 1000)
         
-        # Find closest annotation
-        best_match = None
-        min_diff = float('inf')
+        # Frames aligned to an annotation timestamp resolve with one dict hit
+        exact_idx = self._time_to_index.get(frame_timestamp_ms)
+        if exact_idx is not None and tolerance_ms > 0:
+            return self.annotations[exact_idx]
         
-        for annotation in self.annotations:
-            ann_timestamp = annotation['data_time']
-            diff = abs(ann_timestamp - frame_timestamp_ms)
-            
-            if diff < min_diff:
+        # Binary search for the nearest annotation on either side
+        sorted_times = self._sorted_times
+        if len(sorted_times) == 0:
+            return None
+        
+        pos = int(np.searchsorted(sorted_times, frame_timestamp_ms))
+        
+        # Candidates are the first annotation of the run just before the
+        # frame (earliest in file order, as the sort is stable) and the one
+        # at the insertion point, which is already first of its run
+        candidates = []
+        if pos > 0:
+            candidates.append(int(np.searchsorted(sorted_times, sorted_times[pos - 1], side='left')))
+        if pos < len(sorted_times):
+            candidates.append(pos)
+        
+        # Closest annotation wins; on equal distance, the earlier in the file
+        best_idx = None
+        min_diff = float('inf')
+        for candidate in candidates:
+            diff = abs(int(sorted_times[candidate]) - frame_timestamp_ms)
+            idx = int(self._sorted_order[candidate])
+            if diff < min_diff or (diff == min_diff and idx < best_idx):
                 min_diff = diff
-                best_match = annotation
+                best_idx = idx
         
         # Only return if difference is within tolerance
         if min_diff < tolerance_ms:
-            return best_match
+            return self.annotations[best_idx]
         
         return None
     
-
+    def match_frames_bulk(self, timestamps: List[float],
+                          tolerance_ms: int = 100) -> np.ndarray:
+        """
+        Match many frames to annotations in one vectorized search.
+        
+        Gives the same result as match_frame_to_annotation for every frame,
+        as indices instead of annotation dictionaries.
+        
+        Args:
+            timestamps: Frame timestamps in seconds
+            tolerance_ms: Matching tolerance in milliseconds
+            
+        Returns:
+            int64 array with one annotation index per frame, -1 for no match
+        """
+        frame_ms = (np.asarray(timestamps, dtype=np.float64) * 1000).astype(np.int64)
+        sorted_times = self._sorted_times
+        if len(sorted_times) == 0:
+            return np.full(len(frame_ms), -1, dtype=np.int64)
+        
+        # Nearest annotation on either side. The left candidate is stepped
+        # back to the first of its run of equal timestamps (earliest in file
+        # order); the insertion point is already first of its run
+        pos = np.searchsorted(sorted_times, frame_ms)
+        left = np.searchsorted(sorted_times, sorted_times[np.maximum(pos - 1, 0)], side='left')
+        right = np.minimum(pos, len(sorted_times) - 1)
+        no_match = np.iinfo(np.int64).max
+        left_diff = np.where(pos > 0, frame_ms - sorted_times[left], no_match)
+        right_diff = np.where(pos < len(sorted_times), sorted_times[right] - frame_ms, no_match)
+        
+        # On equal distance, the annotation earlier in the file wins
+        left_idx = self._sorted_order[left]
+        right_idx = self._sorted_order[right]
+        use_left = (left_diff < right_diff) | ((left_diff == right_diff) & (left_idx < right_idx))
+        best_idx = np.where(use_left, left_idx, right_idx)
+        min_diff = np.where(use_left, left_diff, right_diff)
+        
+        # Only keep matches within tolerance
+        return np.where(min_diff < tolerance_ms, best_idx, -1)
@@ -3,34 +3,44 @@ Video export functionality.
 """
 
 import logging
+import os
 import cv2
 import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from tqdm import tqdm
 
 from .loader import ThermalDataLoader, AnnotationLoader
 from .visualizer import AnnotationVisualizer
 
+try:
+    import ffmpegcv
+except (ImportError, RuntimeError):
+    # ffmpegcv raises RuntimeError at import when no ffmpeg binary is on PATH
+    ffmpegcv = None
+
 logger = logging.getLogger(__name__)
 
 
 class VideoExporter:
     """Export annotated thermal data as video."""
     
-    def __init__(self, fps: int = 10, scale_factor: int = 8):
+    def __init__(self, fps: int = 10, scale_factor: int = 8, colormap: Optional[int] = None):
         """
         Initialize video exporter.
         
         Args:
             fps: Frames per second for output video
             scale_factor: Scale factor to upscale thermal frames
+            colormap: OpenCV colormap for false-color frames (None = grayscale)
         """
         self.fps = fps
         self.scale_factor = scale_factor
         self.thermal_loader = ThermalDataLoader()
         self.annotation_loader = AnnotationLoader()
-        self.visualizer = AnnotationVisualizer(scale_factor=scale_factor)
+        self.visualizer = AnnotationVisualizer(scale_factor=scale_factor, colormap=colormap)
     
     def load_data(self, data_path: str, annotation_path: str):
         """
@@ -47,20 +57,29 @@ class VideoExporter:
     def export_video(self, output_path: str, 
                     start_frame: int = 0,
                     num_frames: Optional[int] = None,
-                    codec: str = 'mp4v') -> str:
+                    codec: str = 'mp4v',
+                    backend: str = 'opencv',
+                    gpu: bool = False,
+                    num_workers: Optional[int] = None) -> str:
         """
         Export annotated frames as video.
         
+        Frames are rendered on a thread pool (OpenCV drawing and the NumPy
+        upscale release the GIL) and written in order on the calling thread.
+        
         Args:
             output_path: Path for output video file
             start_frame: Starting frame index
             num_frames: Number of frames to export (None = all)
-            codec: Video codec fourcc code
+            codec: Video codec fourcc code (opencv backend only)
+            backend: Video writer backend ('opencv' or 'ffmpegcv')
+            gpu: Encode with NVENC when available (ffmpegcv backend only)
+            num_workers: Number of render threads (None = CPU count)
             
         Returns:
             Path to created video file
         """
-        logger.info(f"Exporting video to {output_path}")
+        logger.info("Exporting video to %s", output_path)
         
         # Determine frame range
         total_frames = len(self.thermal_loader.frames_celsius)
@@ -68,85 +87,130 @@ class VideoExporter:
             num_frames = total_frames - start_frame
         end_frame = min(start_frame + num_frames, total_frames)
         
-        logger.info(f"Exporting frames {start_frame} to {end_frame-1} ({end_frame-start_frame} frames)")
+        logger.info("Exporting frames %s to %s (%s frames)", start_frame, end_frame-1, end_frame-start_frame)
         
         # Calculate global temperature range for consistent visualization
         vmin, vmax = self._calculate_temperature_range(start_frame, end_frame)
-        logger.info(f"Temperature range: {vmin:.1f}°C to {vmax:.1f}°C")
+        logger.info("Temperature range: %.1f°C to %.1f°C", vmin, vmax)
         
-        # Get first frame to determine dimensions (visualizer handles scaling internally)
-        first_frame = self.thermal_loader.get_frame(start_frame)
-        first_annotation = self.annotation_loader.match_frame_to_annotation(
-            start_frame, self.thermal_loader.timestamps
+        # Normalize the whole frame range to 8-bit in one vectorized pass
+        gray_frames = self.visualizer.normalize_frames_for_display(
+            self.thermal_loader.frames_celsius[start_frame:end_frame], vmin, vmax
         )
-        first_viz = self.visualizer.visualize_frame(
-            first_frame, first_annotation, 
-            self.thermal_loader.get_timestamp(start_frame),
-            start_frame, vmin, vmax
+        
+        # Resolve timestamps and annotations for the whole range up front
+        timestamps = self._frame_timestamps(start_frame, end_frame)
+        annotations = self._match_annotations(start_frame, end_frame)
+        
+        # Get first frame to determine dimensions (visualizer handles scaling internally)
+        first_viz = self.visualizer.visualize_normalized_frame(
+            gray_frames[0], annotations[0], timestamps[0], start_frame
         )
         
         # Get dimensions from scaled frame
         height, width = first_viz.shape[:2]
         
-        logger.info(f"Video dimensions: {width}x{height}")
+        logger.info("Video dimensions: %sx%s", width, height)
         
         # Create video writer
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        fourcc = cv2.VideoWriter_fourcc(*codec)
-        writer = cv2.VideoWriter(
-            str(output_path),
-            fourcc,
-            self.fps,
-            (width, height)
-        )
+        writer = self._create_writer(output_path, codec, width, height, backend, gpu)
         
         if not writer.isOpened():
             raise RuntimeError(f"Failed to create video writer for {output_path}")
         
-        # Process and write frames
+        # Process frames on the render pool and write them in order
+        num_workers = num_workers or os.cpu_count() or 1
+        max_pending = num_workers * 2  # Bound memory held by rendered frames
+        
         logger.info("Processing frames...")
-        for frame_idx in tqdm(range(start_frame, end_frame), desc="Creating video"):
-            frame = self.thermal_loader.get_frame(frame_idx)
-            timestamp = self.thermal_loader.get_timestamp(frame_idx)
-            annotation = self.annotation_loader.match_frame_to_annotation(
-                frame_idx, self.thermal_loader.timestamps
-            )
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            pending = deque()
             
-            # Visualize frame (scaling is handled inside visualizer)
-            viz_frame = self.visualizer.visualize_frame(
-                frame, annotation, timestamp, frame_idx, vmin, vmax
-            )
+            for frame_idx in tqdm(range(start_frame, end_frame), desc="Creating video"):
+                offset = frame_idx - start_frame
+                
+                # Visualize frame (scaling is handled inside visualizer)
+                pending.append(executor.submit(
+                    self.visualizer.visualize_normalized_frame,
+                    gray_frames[offset], annotations[offset], timestamps[offset], frame_idx
+                ))
+                
+                # Write frames directly (already scaled by visualizer)
+                if len(pending) >= max_pending:
+                    writer.write(pending.popleft().result())
             
-            # Write frame directly (already scaled by visualizer)
-            writer.write(viz_frame)
+            for future in pending:
+                writer.write(future.result())
         
         writer.release()
         
-        logger.info(f"Video exported successfully to {output_path}")
-        logger.info(f"Video stats: {end_frame - start_frame} frames, {self.fps} fps, "
-                   f"{(end_frame - start_frame) / self.fps:.1f} seconds")
+        logger.info("Video exported successfully to %s", output_path)
+        logger.info("Video stats: %s frames, %s fps, %.1f seconds",
+                    end_frame - start_frame, self.fps, (end_frame - start_frame) / self.fps)
         
         return str(output_path)
     
+    def _create_writer(self, output_path: Path, codec: str, width: int, height: int,
+                       backend: str = 'opencv', gpu: bool = False):
+        """
+        Create a video writer for the requested backend.
+        
+        Args:
+            output_path: Path for output video file
+            codec: Video codec fourcc code (opencv backend only)
+            width: Frame width
+            height: Frame height
+            backend: 'opencv' (cv2.VideoWriter) or 'ffmpegcv' (ffmpeg subprocess, H.264)
+            gpu: Use the NVENC encoder when an NVIDIA GPU is present (ffmpegcv only)
+            
+        Returns:
+            Video writer with write(frame), isOpened() and release()
+        """
+        if backend == 'opencv':
+            fourcc = cv2.VideoWriter_fourcc(*codec)
+            return cv2.VideoWriter(str(output_path), fourcc, self.fps, (width, height))
+        
+        if backend != 'ffmpegcv':
+            raise ValueError(f"Unsupported video backend: {backend}")
+        
+        if ffmpegcv is None:
+            raise RuntimeError("The ffmpegcv backend requires the ffmpegcv package "
+                               "(uv sync --extra video) and an ffmpeg binary on PATH")
+        
+        if gpu:
+            if ffmpegcv.get_num_NVIDIA_GPUs() > 0:
+                logger.info("Encoding with NVENC (ffmpegcv)")
+                return ffmpegcv.VideoWriterNV(str(output_path), None, self.fps)
+            logger.warning("No NVIDIA GPU found, falling back to CPU encoding")
+        
+        # libx264 with the fastest preset; frame size comes from the first frame
+        return ffmpegcv.VideoWriter(str(output_path), None, self.fps, preset='ultrafast')
+    
     def export_frames_as_images(self, output_dir: str,
                                start_frame: int = 0,
                                num_frames: Optional[int] = None,
-                               image_format: str = 'png') -> str:
+                               image_format: str = 'png',
+                               num_workers: Optional[int] = None) -> str:
         """
         Export annotated frames as individual images.
         
+        Frames are rendered in order on the calling thread and encoded on a
+        thread pool (cv2.imwrite releases the GIL while compressing).
+        
         Args:
             output_dir: Directory for output images
             start_frame: Starting frame index
             num_frames: Number of frames to export (None = all)
             image_format: Image format (png, jpg)
+            num_workers: Number of encoder threads (None = CPU count)
             
         Returns:
             Path to output directory
         """
-        logger.info(f"Exporting frames to {output_dir}")
+        logger.info("Exporting frames to %s", output_dir)
         
         # Create output directory
         output_path = Path(output_dir)
@@ -161,27 +225,82 @@ class VideoExporter:
         # Calculate global temperature range
         vmin, vmax = self._calculate_temperature_range(start_frame, end_frame)
         
-        # Process and save frames
-        logger.info(f"Processing {end_frame - start_frame} frames...")
-        for frame_idx in tqdm(range(start_frame, end_frame), desc="Exporting frames"):
-            frame = self.thermal_loader.get_frame(frame_idx)
-            timestamp = self.thermal_loader.get_timestamp(frame_idx)
-            annotation = self.annotation_loader.match_frame_to_annotation(
-                frame_idx, self.thermal_loader.timestamps
-            )
+        # Normalize the whole frame range to 8-bit in one vectorized pass
+        gray_frames = self.visualizer.normalize_frames_for_display(
+            self.thermal_loader.frames_celsius[start_frame:end_frame], vmin, vmax
+        )
+        
+        # Resolve timestamps and annotations for the whole range up front
+        timestamps = self._frame_timestamps(start_frame, end_frame)
+        annotations = self._match_annotations(start_frame, end_frame)
+        
+        # Build output file names from a plain string prefix (no Path per frame)
+        file_prefix = os.path.join(os.fspath(output_path), "frame_")
+        
+        # Process frames and hand them to the encoder pool
+        num_workers = num_workers or os.cpu_count() or 1
+        max_pending = num_workers * 2  # Bound memory held by queued frames
+        
+        logger.info("Processing %s frames...", end_frame - start_frame)
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            pending = deque()
             
-            # Visualize frame (scaling is handled inside visualizer)
-            viz_frame = self.visualizer.visualize_frame(
-                frame, annotation, timestamp, frame_idx, vmin, vmax
-            )
+            for frame_idx in tqdm(range(start_frame, end_frame), desc="Exporting frames"):
+                offset = frame_idx - start_frame
+                
+                # Visualize frame (scaling is handled inside visualizer)
+                viz_frame = self.visualizer.visualize_normalized_frame(
+                    gray_frames[offset], annotations[offset], timestamps[offset], frame_idx
+                )
+                
+                # Save frame directly (already scaled by visualizer)
+                output_file = f"{file_prefix}{frame_idx:04d}.{image_format}"
+                pending.append(executor.submit(cv2.imwrite, output_file, viz_frame))
+                
+                if len(pending) >= max_pending:
+                    pending.popleft().result()
             
-            # Save frame directly (already scaled by visualizer)
-            output_file = output_path / f"frame_{frame_idx:04d}.{image_format}"
-            cv2.imwrite(str(output_file), viz_frame)
+            for future in pending:
+                future.result()
         
-        logger.info(f"Frames exported to {output_dir}")
+        logger.info("Frames exported to %s", output_dir)
         return str(output_dir)
     
+    def _frame_timestamps(self, start_frame: int, end_frame: int) -> List[Optional[float]]:
+        """
+        Get the timestamps of a range of frames with one slice.
+        
+        Args:
+            start_frame: Starting frame index
+            end_frame: Ending frame index
+            
+        Returns:
+            Timestamp (or None, like get_timestamp) per frame in the range
+        """
+        timestamps = self.thermal_loader.timestamps[start_frame:end_frame].tolist()
+        timestamps.extend([None] * (end_frame - start_frame - len(timestamps)))
+        return timestamps
+    
+    def _match_annotations(self, start_frame: int, end_frame: int) -> List[Optional[Dict]]:
+        """
+        Match a range of frames to their annotations in one vectorized search.
+        
+        Args:
+            start_frame: Starting frame index
+            end_frame: Ending frame index
+            
+        Returns:
+            Annotation dictionary (or None) per frame in the range
+        """
+        frame_timestamps = self.thermal_loader.timestamps[start_frame:end_frame]
+        matches = self.annotation_loader.match_frames_bulk(frame_timestamps).tolist()
+        
+        # Frames past the last timestamp have nothing to match
+        matches.extend([-1] * (end_frame - start_frame - len(matches)))
+        
+        all_annotations = self.annotation_loader.annotations
+        return [all_annotations[idx] if idx >= 0 else None for idx in matches]
+    
     def _calculate_temperature_range(self, start_frame: int, 
                                      end_frame: int) -> Tuple[float, float]:
         """
@@ -196,9 +315,9 @@ class VideoExporter:
         """
         frames = self.thermal_loader.frames_celsius[start_frame:end_frame]
         
-        # Calculate range with some margin
-        vmin = np.percentile(frames, 1)  # 1st percentile
-        vmax = np.percentile(frames, 99)  # 99th percentile
+        # Calculate range with some margin: 1st and 99th percentile from one
+        # call, so the stack is copied and partitioned once for both
+        vmin, vmax = np.percentile(frames, [1, 99])
         
         # Add small margin
         margin = (vmax - vmin) * 0.05
@@ -214,32 +333,39 @@ class VideoExporter:
         Args:
             output_path: Path for summary text file
         """
-        logger.info(f"Creating summary report: {output_path}")
+        logger.info("Creating summary report: %s", output_path)
         
-        with open(output_path, 'w') as f:
-            f.write("=" * 60 + "\n")
-            f.write("THERMAL DATA ANNOTATION SUMMARY\n")
-            f.write("=" * 60 + "\n\n")
+        frames_celsius = self.thermal_loader.frames_celsius
+        timestamps = self.thermal_loader.timestamps
+        
+        # Assemble the whole report in memory and write it with one call
+        lines = [
+            "=" * 60 + "\n",
+            "THERMAL DATA ANNOTATION SUMMARY\n",
+            "=" * 60 + "\n\n",
             
             # Dataset info
-            f.write(f"Total Frames: {len(self.thermal_loader.frames_celsius)}\n")
-            f.write(f"Annotated Frames: {len(self.annotation_loader.annotations)}\n")
-            f.write(f"Temperature Range: {np.min(self.thermal_loader.frames_celsius):.1f}°C to "
-                   f"{np.max(self.thermal_loader.frames_celsius):.1f}°C\n")
-            f.write(f"Duration: {self.thermal_loader.timestamps[-1] - self.thermal_loader.timestamps[0]:.1f} seconds\n\n")
+            f"Total Frames: {len(frames_celsius)}\n",
+            f"Annotated Frames: {len(self.annotation_loader.annotations)}\n",
+            f"Temperature Range: {np.min(frames_celsius):.1f}°C to "
+            f"{np.max(frames_celsius):.1f}°C\n",
+            f"Duration: {timestamps[-1] - timestamps[0]:.1f} seconds\n\n",
             
             # Category statistics
-            f.write("Categories Found:\n")
-            f.write("-" * 60 + "\n")
-            for class_id, category in sorted(self.annotation_loader.id_to_category.items()):
-                count = sum(
-                    1 for ann in self.annotation_loader.annotations
-                    for obj in ann.get('annotations', [])
-                    if f"{obj.get('category')}/{obj.get('subcategory')}" == category
-                )
-                f.write(f"  {class_id}: {category:<40} ({count} instances)\n")
-            
-            f.write("\n" + "=" * 60 + "\n")
+            "Categories Found:\n",
+            "-" * 60 + "\n",
+        ]
+        # Instances per category in one pass over the per-object category IDs
+        id_to_category = self.annotation_loader.id_to_category
+        counts = np.bincount(self.annotation_loader.object_category_ids,
+                             minlength=len(id_to_category))
+        for class_id, category in sorted(id_to_category.items()):
+            lines.append(f"  {class_id}: {category:<40} ({counts[class_id]} instances)\n")
+        
+        lines.append("\n" + "=" * 60 + "\n")
+        
+        with open(output_path, 'w') as f:
+            f.write("".join(lines))
         
-        logger.info(f"Summary report created: {output_path}")
+        logger.info("Summary report created: %s", output_path)
 
@@ -5,11 +5,19 @@ Annotation visualization functionality.
 import logging
 import numpy as np
 import cv2
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4096)
+def _label_text_size(text: str, font: int, font_scale: float,
+                     thickness: int) -> Tuple[Tuple[int, int], int]:
+    """cv2.getTextSize, memoized for label strings that repeat across frames."""
+    return cv2.getTextSize(text, font, font_scale, thickness)
+
+
 class AnnotationVisualizer:
     """Visualize annotations on thermal frames."""
     
@@ -23,7 +31,8 @@ class AnnotationVisualizer:
         'appliance': (255, 0, 255), # Magenta
     }
     
-    def __init__(self, font_scale: float = 0.5, line_thickness: int = 2, scale_factor: int = 8):
+    def __init__(self, font_scale: float = 0.5, line_thickness: int = 2, scale_factor: int = 8,
+                 colormap: Optional[int] = None):
         """
         Initialize visualizer.
         
@@ -31,12 +40,15 @@ class AnnotationVisualizer:
             font_scale: Scale factor for text (will be multiplied by scale_factor)
             line_thickness: Thickness of bounding box lines
             scale_factor: Image upscaling factor (applied before drawing)
+            colormap: OpenCV colormap (e.g. cv2.COLORMAP_INFERNO) for false-color
+                frames; None keeps grayscale
         """
         self.base_font_scale = font_scale
         self.scale_factor = scale_factor
         self.font_scale = font_scale * (scale_factor / 8)  # Adjust for scale
         self.line_thickness = max(2, line_thickness * (scale_factor // 4))  # Thicker lines for larger images
         self.font = cv2.FONT_HERSHEY_SIMPLEX
+        self.colormap = colormap
     
     def normalize_frame_for_display(self, frame: np.ndarray, 
                                      vmin: Optional[float] = None,
@@ -57,10 +69,39 @@ class AnnotationVisualizer:
         if vmax is None:
             vmax = np.max(frame)
         
-        # Normalize to 0-255
-        normalized = ((frame - vmin) / (vmax - vmin) * 255).astype(np.uint8)
+        # Normalize to 0-255; values outside [vmin, vmax] (e.g. a percentile
+        # range) saturate instead of wrapping around in the uint8 cast
+        normalized = (frame - vmin) / (vmax - vmin) * 255
+        np.clip(normalized, 0, 255, out=normalized)
+        
+        return normalized.astype(np.uint8)
+    
+    def normalize_frames_for_display(self, frames: np.ndarray,
+                                     vmin: Optional[float] = None,
+                                     vmax: Optional[float] = None) -> np.ndarray:
+        """
+        Normalize a stack of thermal frames to 8-bit grayscale in one pass.
+        
+        Args:
+            frames: Thermal frames (N, H, W) in Celsius
+            vmin: Minimum value for normalization (per-frame minimum if None)
+            vmax: Maximum value for normalization (per-frame maximum if None)
+            
+        Returns:
+            8-bit grayscale stack (N, H, W)
+        """
+        # Batched reductions keep per-frame auto-ranging without a Python loop
+        if vmin is None:
+            vmin = frames.min(axis=(1, 2), keepdims=True)
+        if vmax is None:
+            vmax = frames.max(axis=(1, 2), keepdims=True)
+        
+        # Normalize to 0-255, saturating values outside [vmin, vmax] (clipped
+        # in place, so the stack gets no extra temporary)
+        normalized = (frames - vmin) / (vmax - vmin) * 255
+        np.clip(normalized, 0, 255, out=normalized)
         
-        return normalized
+        return normalized.astype(np.uint8)
     
     def draw_bbox(self, image: np.ndarray, bbox: List[float], 
                   color: Tuple[int, int, int]) -> np.ndarray:
@@ -120,8 +161,8 @@ class AnnotationVisualizer:
         x = int(x_norm * width)
         y = int(y_norm * height)
         
-        # Get text size for background
-        (text_width, text_height), baseline = cv2.getTextSize(
+        # Get text size for background (labels repeat across frames)
+        (text_width, text_height), baseline = _label_text_size(
             label_text, self.font, self.font_scale, 1
         )
         
@@ -217,14 +258,34 @@ class AnnotationVisualizer:
         # Normalize frame to 8-bit grayscale
         gray = self.normalize_frame_for_display(frame, vmin, vmax)
         
-        # Convert to BGR for color annotations
-        bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        return self.visualize_normalized_frame(gray, annotation, timestamp, frame_idx)
+    
+    def visualize_normalized_frame(self, gray: np.ndarray, annotation: Optional[Dict],
+                                   timestamp: float, frame_idx: int) -> np.ndarray:
+        """
+        Visualize an already-normalized 8-bit frame with annotations.
         
+        Args:
+            gray: 8-bit grayscale frame (see normalize_frames_for_display)
+            annotation: Annotation dictionary or None
+            timestamp: Frame timestamp
+            frame_idx: Frame index
+            
+        Returns:
+            Annotated image (BGR), scaled up by scale_factor
+        """
         # SCALE UP FIRST before drawing text (critical for readability!)
-        height, width = bgr.shape[:2]
-        scaled_width = width * self.scale_factor
-        scaled_height = height * self.scale_factor
-        bgr = cv2.resize(bgr, (scaled_width, scaled_height), interpolation=cv2.INTER_NEAREST)
+        # Nearest-neighbour upscaling by an integer factor is plain pixel
+        # replication, so replicate the single-channel plane (1/3 of the bytes)
+        scale = self.scale_factor
+        scaled = np.repeat(np.repeat(gray, scale, axis=0), scale, axis=1)
+        
+        # Convert to BGR for color annotations; a colormap is a single table
+        # lookup that replaces the gray-to-BGR conversion
+        if self.colormap is None:
+            bgr = cv2.cvtColor(scaled, cv2.COLOR_GRAY2BGR)
+        else:
+            bgr = cv2.applyColorMap(scaled, self.colormap)
         
         # Now draw annotations on the scaled image
         if annotation and 'annotations' in annotation:
@@ -6,6 +6,9 @@ This package contains unit tests for TDengine connection and PyTorch training pi
 Test Modules:
 - test_diagnose_tdengine: TDengine connection and query tests
 - test_training_pipeline: PyTorch DataLoader and dataset tests
+- test_tdengine_connector: Offline TDengineConnector query and decoding tests
+- test_annotation_loader: Offline AnnotationLoader frame matching tests
+- test_data_loader: Offline ThermalDataLoader text and NumPy file tests
 
 Run all tests:
     python -m unittest discover tests
@@ -15,5 +18,6 @@ Run specific test module:
     python -m unittest tests.test_training_pipeline
 """
 
-__all__ = ['test_diagnose_tdengine', 'test_training_pipeline']
+__all__ = ['test_diagnose_tdengine', 'test_training_pipeline', 'test_tdengine_connector',
+           'test_annotation_loader', 'test_data_loader']
 
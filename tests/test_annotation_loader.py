@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Annotation Loader Unit Tests
+
+Tests for AnnotationLoader frame-to-annotation matching and the thermal
+frame loader's units. These run offline on small synthetic files.
+Run with: python -m unittest tests.test_annotation_loader
+"""
+
+import unittest
+import logging
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+from src.visualize_annotations import AnnotationLoader, ThermalDataLoader
+
+# Configure logging
+logging.basicConfig(
+    level=logging.ERROR,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class AnnotationMatchingTests(unittest.TestCase):
+    """Test suite for matching frames to annotations by timestamp."""
+    
+    def setUp(self):
+        """Create a scratch directory for annotation files."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+    
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.tmp_dir.cleanup()
+    
+    def load_annotations(self, data_times):
+        """Write one annotation per timestamp (id = file position) and load them."""
+        path = self.tmp_path / 'annotations.json'
+        with open(path, 'w') as f:
+            for i, data_time in enumerate(data_times):
+                f.write(json.dumps({'id': i, 'data_time': int(data_time), 'annotations': []}) + '\n')
+        
+        loader = AnnotationLoader()
+        loader.load(str(path))
+        return loader
+    
+    @staticmethod
+    def linear_scan(data_times, timestamp, tolerance_ms):
+        """Reference match: first annotation in file order with the smallest distance."""
+        frame_ms = int(timestamp * 1000)
+        diffs = [abs(int(t) - frame_ms) for t in data_times]
+        best = int(np.argmin(diffs))
+        return best if diffs[best] < tolerance_ms else -1
+    
+    def match_ids(self, loader, timestamps, tolerance_ms=100):
+        """Annotation ids from the single-frame matcher, -1 for no match."""
+        ids = []
+        for frame_idx in range(len(timestamps)):
+            ann = loader.match_frame_to_annotation(frame_idx, timestamps, tolerance_ms)
+            ids.append(ann['id'] if ann is not None else -1)
+        return ids
+    
+    def test_01_duplicate_timestamps_pick_first(self):
+        """Test that annotations sharing a timestamp resolve to the first one."""
+        loader = self.load_annotations([1000, 1000])
+        timestamps = [1.0, 1.01, 0.99]
+        
+        self.assertEqual(self.match_ids(loader, timestamps), [0, 0, 0])
+        self.assertEqual(loader.match_frames_bulk(timestamps).tolist(), [0, 0, 0])
+    
+    def test_02_equal_distance_picks_earlier_in_file(self):
+        """Test that a frame midway between two annotations takes the earlier file entry."""
+        loader = self.load_annotations([1100, 1000, 1000])
+        timestamps = [1.05]
+        
+        self.assertEqual(self.match_ids(loader, timestamps), [0])
+        self.assertEqual(loader.match_frames_bulk(timestamps).tolist(), [0])
+    
+    def test_03_matches_linear_scan(self):
+        """Test both matchers against a linear scan on unsorted, duplicated timestamps."""
+        rng = np.random.default_rng(0)
+        data_times = rng.choice(np.arange(0, 5000, 50), size=200)
+        timestamps = (rng.integers(-200, 5200, size=500) / 1000.0).tolist()
+        loader = self.load_annotations(data_times)
+        
+        expected = [self.linear_scan(data_times, ts, 100) for ts in timestamps]
+        
+        self.assertEqual(self.match_ids(loader, timestamps), expected)
+        self.assertEqual(loader.match_frames_bulk(timestamps).tolist(), expected)
+        
+        logger.info("✅ %s/%s frames matched", sum(i >= 0 for i in expected), len(expected))
+
+
+
+class ThermalFrameUnitTests(unittest.TestCase):
+    """Test suite for the units of the visualization frame loader."""
+    
+    def setUp(self):
+        """Create a scratch directory with a small 2x3 text file."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'frames.txt'
+        self.values = np.array([29815, 29816, 30000, 31234, 28000, 29999])
+        self.path.write_text("header\nt: 1700000000.125 " + " ".join(map(str, self.values)) + "\n")
+    
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.tmp_dir.cleanup()
+    
+    def test_01_frames_kelvin_and_celsius(self):
+        """Test that frames stays in Kelvin while load() returns Celsius."""
+        loader = ThermalDataLoader(target_shape=(2, 3))
+        self.assertIsNone(loader.frames)
+        
+        frames_celsius, timestamps = loader.load(str(self.path))
+        
+        kelvin = (self.values / 10.0).reshape(1, 2, 3)
+        self.assertIs(frames_celsius, loader.frames_celsius)
+        np.testing.assert_allclose(frames_celsius, kelvin - 273.15, atol=1e-4)
+        np.testing.assert_allclose(loader.frames, kelvin, atol=1e-4)
+        np.testing.assert_array_equal(timestamps, [1700000000.125])
+
+
+if __name__ == '__main__':
+    unittest.main()
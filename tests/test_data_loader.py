@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Thermal Data Loader Unit Tests
+
+Tests for ThermalDataLoader text parsing and NumPy round-trips. These run
+offline on small synthetic files.
+Run with: python -m unittest tests.test_data_loader
+"""
+
+import unittest
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+from src.thermal_data_processing import ThermalDataLoader
+from src.thermal_data_processing.data_loader import _parse_decikelvin_tokens
+
+# Configure logging
+logging.basicConfig(
+    level=logging.ERROR,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class DeciKelvinTokenTests(unittest.TestCase):
+    """Test suite for the deciKelvin token scanner."""
+    
+    def test_01_standalone_five_digit_runs(self):
+        """Test that only digit runs of exactly five are returned, in order."""
+        line = b"29815,12 123456 30000\t00001x99999 2981\n"
+        
+        values = _parse_decikelvin_tokens(line)
+        
+        self.assertEqual(values.dtype, np.int32)
+        self.assertEqual(values.tolist(), [29815, 30000, 1, 99999])
+    
+    def test_02_no_tokens(self):
+        """Test lines without any 5-digit run."""
+        self.assertEqual(_parse_decikelvin_tokens(b"").tolist(), [])
+        self.assertEqual(_parse_decikelvin_tokens(b"\n").tolist(), [])
+        self.assertEqual(_parse_decikelvin_tokens(b"header 1234 123456\n").tolist(), [])
+
+
+class TextFileTests(unittest.TestCase):
+    """Test suite for loading deciKelvin text files."""
+    
+    def setUp(self):
+        """Create a scratch directory and a small 2x3 text file."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        self.loader = ThermalDataLoader(target_shape=(2, 3))
+        
+        self.values = np.array([
+            [29815, 29816, 30000, 31234, 28000, 29999],
+            [30500, 30501, 30502, 30503, 30504, 30505],
+        ])
+        self.timestamps = [1700000000.125, 1700000000.225]
+        
+        # Header, blank lines, and a short line that is not a frame
+        lines = ["thermal sensor 40x60 header", ""]
+        for ts, row in zip(self.timestamps, self.values):
+            lines.append(f"t: {ts} " + " ".join(str(v) for v in row))
+            lines.append("   ")
+        lines.append("t: 1700000000.325 30000 30000")
+        
+        self.path = self.tmp_path / 'frames.txt'
+        self.path.write_text("\n".join(lines) + "\n")
+    
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.tmp_dir.cleanup()
+    
+    def test_01_kelvin(self):
+        """Test the default Kelvin output."""
+        frames, timestamps = self.loader.load_from_text_file(str(self.path))
+        
+        self.assertEqual(frames.dtype, np.float32)
+        self.assertEqual(frames.shape, (2, 2, 3))
+        np.testing.assert_array_equal(frames, (self.values / 10.0).astype(np.float32).reshape(2, 2, 3))
+        
+        # The short line still carries a timestamp
+        self.assertEqual(timestamps.dtype, np.float64)
+        np.testing.assert_array_equal(timestamps, self.timestamps + [1700000000.325])
+    
+    def test_02_celsius(self):
+        """Test that Celsius output matches converting the Kelvin frames."""
+        kelvin, _ = self.loader.load_from_text_file(str(self.path))
+        celsius, _ = self.loader.load_from_text_file(str(self.path), to_celsius=True)
+        
+        np.testing.assert_array_equal(celsius, kelvin - np.float32(273.15))
+    
+    def test_03_raw_decikelvin(self):
+        """Test the raw uint16 deciKelvin output and its range check."""
+        frames, _ = self.loader.load_from_text_file(str(self.path), raw_decikelvin=True)
+        
+        self.assertEqual(frames.dtype, np.uint16)
+        np.testing.assert_array_equal(frames, self.values.reshape(2, 2, 3))
+        
+        path = self.tmp_path / 'hot.txt'
+        path.write_text("header\n70000 30000 30000 30000 30000 30000\n")
+        with self.assertRaises(ValueError):
+            self.loader.load_from_text_file(str(path), raw_decikelvin=True)
+        with self.assertRaises(ValueError):
+            self.loader.load_from_text_file(str(self.path), to_celsius=True, raw_decikelvin=True)
+    
+    def test_04_empty_file(self):
+        """Test that empty and header-only files load as zero frames."""
+        for content in ("", "header only\n"):
+            path = self.tmp_path / 'empty.txt'
+            path.write_text(content)
+            
+            frames, timestamps = self.loader.load_from_text_file(str(path))
+            
+            self.assertEqual(frames.shape, (0, 2, 3))
+            self.assertEqual(timestamps.shape, (0,))
+
+
+class NumpyRoundTripTests(unittest.TestCase):
+    """Test suite for saving and loading NumPy files."""
+    
+    def setUp(self):
+        """Create a scratch directory and a small frame stack."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        self.loader = ThermalDataLoader()
+        self.frames = np.random.default_rng(0).uniform(280, 320, (5, 40, 60)).astype(np.float32)
+    
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.tmp_dir.cleanup()
+    
+    def test_01_default_load_is_writable(self):
+        """Test that a default .npy load returns a writable in-memory array."""
+        path = self.tmp_path / 'frames.npy'
+        np.save(path, self.frames)
+        
+        frames, timestamps = self.loader.load_thermal_data(str(path))
+        frames -= 273.15
+        
+        self.assertNotIsInstance(frames, np.memmap)
+        self.assertIsNone(timestamps)
+        np.testing.assert_array_equal(frames, self.frames - np.float32(273.15))
+    
+    def test_02_mmap_save_back_to_same_path(self):
+        """Test that a memory-mapped load can be edited and saved over its source."""
+        path = self.tmp_path / 'frames.npy'
+        np.save(path, self.frames)
+        
+        frames = self.loader.load_from_numpy(str(path), use_mmap=True)
+        self.assertIsInstance(frames, np.memmap)
+        
+        # Copy-on-write: in-place edits never reach the file being read
+        frames -= 273.15
+        self.loader.save_thermal_data(frames, str(path))
+        
+        reloaded = self.loader.load_from_numpy(str(path))
+        np.testing.assert_array_equal(reloaded, self.frames - np.float32(273.15))
+        self.assertEqual(sorted(p.name for p in self.tmp_path.iterdir()), ['frames.npy'])
+    
+    def test_03_npz_timestamps_round_trip(self):
+        """Test that timestamps saved in an .npz come back unchanged."""
+        path = self.tmp_path / 'frames.npz'
+        timestamps = [1700000000.125 + i * 0.1 for i in range(len(self.frames))]
+        
+        self.loader.save_thermal_data(self.frames, str(path), timestamps=timestamps)
+        frames, loaded_timestamps = self.loader.load_thermal_data(str(path))
+        
+        np.testing.assert_array_equal(frames, self.frames)
+        self.assertEqual(loaded_timestamps.dtype, np.float64)
+        np.testing.assert_array_equal(loaded_timestamps, np.asarray(timestamps))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+TDengine Connector Unit Tests
+
+Tests for TDengineConnector query matching and frame decoding. The REST
+session is replaced with canned responses, so these run offline.
+Run with: python -m unittest tests.test_tdengine_connector
+"""
+
+import unittest
+import logging
+import sys
+import os
+import json
+import re
+import zlib
+import base64
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+from src.data_pipeline.thermal_dataset import TDengineConnector, _MAX_SQL_LENGTH
+
+# Configure logging
+logging.basicConfig(
+    level=logging.ERROR,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BASE_MS = 1735689600000  # 2025-01-01 00:00:00 UTC
+
+
+def encode_frame(value: float, width: int = 60, height: int = 40) -> str:
+    """Encode a constant float32 Celsius frame the way TDengine stores it."""
+    frame = np.full((height, width), value, dtype=np.float32)
+    return zlib.compress(frame.tobytes()).hex()
+
+
+class BatchQueryTests(unittest.TestCase):
+    """Test suite for matching batch query rows to requested timestamps."""
+    
+    def setUp(self):
+        """Create a connector whose session returns fixed rows."""
+        self.connector = TDengineConnector()
+        
+        # Row i holds a frame filled with the value i
+        offsets_ms = [950, 1040, 1090, 1950, 2050]
+        self.rows = [
+            [TDengineConnector._format_timestamp(BASE_MS + offset), encode_frame(i), 60, 40]
+            for i, offset in enumerate(offsets_ms)
+        ]
+        
+        self.statements = []
+        session = mock.Mock()
+        session.post.side_effect = self.fake_post
+        
+        self.connector._session = session
+        self.connector._session_pid = os.getpid()
+    
+    def fake_post(self, url, data, timeout):
+        """Answer a query with the rows inside its ts ranges (literals sort as text)."""
+        self.statements.append(data)
+        ranges = re.findall(r"ts >= '([^']+)' AND ts <= '([^']+)'", data)
+        rows = [row for row in self.rows if any(start <= row[0] <= end for start, end in ranges)]
+        
+        response = mock.Mock(status_code=200)
+        response.content = json.dumps({'code': 0, 'data': rows}).encode()
+        response.json.return_value = json.loads(response.content)
+        return response
+    
+    def test_01_nearest_row_per_target(self):
+        """Test that each target gets its closest row, earliest on ties."""
+        targets = [BASE_MS + 1000, BASE_MS + 1060, BASE_MS + 2000, BASE_MS + 5000]
+        
+        frames = self.connector.batch_query_frames('02:00:1a:62:51:67', targets)
+        
+        # 1000 -> 1040 (not the later 1090), 1060 -> 1040, 2000 ties 1950/2050
+        # and takes the earlier row, 5000 has no row within tolerance
+        matched = {ts - BASE_MS: int(frame[0, 0]) for ts, frame in frames.items()}
+        self.assertEqual(matched, {1000: 1, 1060: 1, 2000: 3})
+        
+        # Targets sharing a row must not share the array
+        frames[BASE_MS + 1000][0, 0] = -1
+        self.assertEqual(frames[BASE_MS + 1060][0, 0], 1)
+        
+        logger.info("✅ Batch matches: %s", matched)
+    
+    def test_02_agrees_with_single_query(self):
+        """Test that batch and single-frame queries pick the same row."""
+        targets = [BASE_MS + offset for offset in range(900, 2200, 25)]
+        
+        frames = self.connector.batch_query_frames('02:00:1a:62:51:67', targets)
+        
+        for target in targets:
+            single = self.connector.query_frame_by_timestamp('02:00:1a:62:51:67', target)
+            if single is None:
+                self.assertNotIn(target, frames)
+            else:
+                np.testing.assert_array_equal(frames[target], single)
+    
+    def set_rows(self, offsets_ms):
+        """Replace the table with one row per offset; row i holds the value i."""
+        self.rows = [
+            [TDengineConnector._format_timestamp(BASE_MS + offset), encode_frame(i, 4, 2), 4, 2]
+            for i, offset in enumerate(offsets_ms)
+        ]
+    
+    def test_03_long_query_split(self):
+        """Test that many sparse ranges are split into statements under the SQL limit."""
+        self.set_rows([i * 6000 + 30 for i in range(1500)])
+        targets = [BASE_MS + i * 6000 for i in range(1500)]
+        
+        frames = self.connector.batch_query_frames('02:00:1a:62:51:67', targets)
+        
+        self.assertGreater(len(self.statements), 1)
+        self.assertTrue(all(len(sql) <= _MAX_SQL_LENGTH for sql in self.statements))
+        self.assertEqual({ts: int(frame[0, 0]) for ts, frame in frames.items()},
+                         {ts: i for i, ts in enumerate(targets)})
+        
+        logger.info("✅ %s ranges sent in %s statements", len(targets), len(self.statements))
+    
+    def test_04_small_cluster_gap(self):
+        """Test nearest-row matching when cluster_gap_ms is below the tolerance window."""
+        row_offsets = np.arange(2250) * 100 + 7
+        self.set_rows(row_offsets.tolist())
+        targets = BASE_MS + np.arange(1500) * 150
+        
+        # Small gaps never split a cluster (ranges would overlap), so rows
+        # arrive once each and in order
+        frames = self.connector.batch_query_frames('02:00:1a:62:51:67', targets.tolist(),
+                                                   cluster_gap_ms=0)
+        
+        self.assertEqual(len(self.statements), 1)
+        for target in targets.tolist():
+            diffs = np.abs(BASE_MS + row_offsets - target)
+            expected = int(np.argmin(diffs))
+            if diffs[expected] <= 100:
+                self.assertEqual(int(frames[target][0, 0]), expected)
+            else:
+                self.assertNotIn(target, frames)
+    
+    def test_05_corrupt_payload_skipped(self):
+        """Test that one undecodable row does not discard the rest of the batch."""
+        self.rows[1][1] = 'not a frame'
+        targets = [BASE_MS + 950, BASE_MS + 1040, BASE_MS + 1950]
+        
+        frames = self.connector.batch_query_frames('02:00:1a:62:51:67', targets)
+        
+        self.assertEqual({ts - BASE_MS: int(frame[0, 0]) for ts, frame in frames.items()},
+                         {950: 0, 1950: 3})
+
+
+class FrameDecodingTests(unittest.TestCase):
+    """Test suite for TDengine timestamp literals and frame payload decoding."""
+    
+    def setUp(self):
+        """Create a connector (no connection is made)."""
+        self.connector = TDengineConnector()
+    
+    def test_01_format_timestamp(self):
+        """Test that timestamp literals are UTC with millisecond precision."""
+        self.assertEqual(TDengineConnector._format_timestamp(BASE_MS + 1234),
+                         '2025-01-01 00:00:01.234')
+        
+        rng = np.random.default_rng(0)
+        for timestamp_ms in rng.integers(0, 4102444800000, size=200).tolist():
+            expected = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+            self.assertEqual(TDengineConnector._format_timestamp(timestamp_ms),
+                             expected.strftime('%Y-%m-%d %H:%M:%S.') + f"{timestamp_ms % 1000:03d}")
+    
+    def test_02_decompress_int16_hex(self):
+        """Test int16 deciKelvin payloads: Celsius, flipped left-right."""
+        codes = np.random.default_rng(0).integers(2700, 3300, (40, 60)).astype(np.int16)
+        encoded = zlib.compress(codes.tobytes()).hex()
+        
+        frame = self.connector._decompress_frame_data(encoded, 60, 40)
+        
+        expected = (codes[:, ::-1] / 10.0 - 273.15).astype(np.float32)
+        self.assertEqual(frame.dtype, np.float32)
+        self.assertTrue(frame.flags.c_contiguous)
+        np.testing.assert_array_equal(frame, expected)
+    
+    def test_03_decompress_float32_base64(self):
+        """Test float32 Celsius payloads: flipped left-right and writable."""
+        celsius = np.random.default_rng(0).uniform(15, 35, (40, 60)).astype(np.float32)
+        encoded = base64.b64encode(zlib.compress(celsius.tobytes())).decode()
+        
+        frame = self.connector._decompress_frame_data(encoded, 60, 40)
+        
+        self.assertTrue(frame.flags.writeable)
+        self.assertTrue(frame.flags.c_contiguous)
+        np.testing.assert_array_equal(frame, celsius[:, ::-1])
+    
+    def test_04_decompress_bad_size(self):
+        """Test that a payload of the wrong size is rejected."""
+        encoded = zlib.compress(b'\x00' * 100).hex()
+        with self.assertRaises(ValueError):
+            self.connector._decompress_frame_data(encoded, 60, 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
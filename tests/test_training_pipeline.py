@@ -10,12 +10,15 @@ import unittest
 import logging
 import sys
 import os
+import tempfile
 from pathlib import Path
+from unittest import mock
 
 # Add project root to path for imports
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+import numpy as np
 import torch
 from src.data_pipeline import ThermalAnnotationDataset, create_dataloader
 
@@ -205,6 +208,56 @@ class ThermalDatasetCacheTests(unittest.TestCase):
             self.assertIsInstance(frame, torch.Tensor, f"Sample {i} should be tensor")
         
         logger.info(f"✅ Accessed {min(3, len(dataset))} cached samples")
+    
+    def test_03_batch_miss_not_refetched(self):
+        """Test that a frame the batch query found missing is not queried again per sample."""
+        logger.info("\nTEST: Batch Miss Not Refetched")
+        logger.info("-" * 50)
+        
+        dataset = ThermalAnnotationDataset(
+            annotation_file=self.annotation_file,
+            mac_address=self.mac_address,
+            cache_frames=True
+        )
+        
+        # The batch query succeeds but TDengine has no rows; keep the test offline
+        dataset.tdengine._query_rows = lambda sql, timeout: []
+        dataset.tdengine.query_frame_by_timestamp = mock.Mock(return_value=None)
+        
+        samples = dataset.__getitems__([0, 1, 2])
+        
+        dataset.tdengine.query_frame_by_timestamp.assert_not_called()
+        for frame, _ in samples:
+            self.assertTrue(torch.all(frame == 0))
+        
+        logger.info(f"✅ Missing frames cached as zeros from the batch query")
+    
+    def test_04_failed_batch_falls_back(self):
+        """Test that samples fall back to per-sample queries when the batch query fails."""
+        logger.info("\nTEST: Failed Batch Falls Back")
+        logger.info("-" * 50)
+        
+        dataset = ThermalAnnotationDataset(
+            annotation_file=self.annotation_file,
+            mac_address=self.mac_address,
+            cache_frames=True
+        )
+        
+        # The batch statement fails; the per-sample query finds the frames
+        dataset.tdengine._query_rows = lambda sql, timeout: None
+        dataset.tdengine.query_frame_by_timestamp = mock.Mock(
+            side_effect=lambda mac, ts, tolerance_ms: np.ones((40, 60), dtype=np.float32)
+        )
+        
+        indices = [0, 1, 2]
+        samples = dataset.__getitems__(indices)
+        
+        self.assertEqual(dataset.tdengine.query_frame_by_timestamp.call_count,
+                         len(set(dataset.data_times[indices].tolist())))
+        for frame, _ in samples:
+            self.assertTrue(torch.all(frame == 1))
+        
+        logger.info(f"✅ Failed batch query fell back to per-sample lookups")
 
 
 class PyTorchDataLoaderTests(unittest.TestCase):
@@ -344,6 +397,216 @@ class ThermalDataTransformTests(unittest.TestCase):
         
         logger.info(f"✅ Transform applied successfully")
         logger.info(f"   Frame range: [{frame.min():.3f}, {frame.max():.3f}]")
+    
+    def test_02_in_place_target_transform(self):
+        """Test that an in-place target transform does not leak across epochs."""
+        logger.info("\nTEST: In-place Target Transform")
+        logger.info("-" * 50)
+        
+        def scale_boxes(target):
+            """Scale box centers in place."""
+            target['boxes'][:, :2].mul_(10)
+            return target
+        
+        dataset = ThermalAnnotationDataset(
+            annotation_file=self.annotation_file,
+            mac_address=self.mac_address,
+            target_transform=scale_boxes,
+            cache_frames=True
+        )
+        reference = ThermalAnnotationDataset(
+            annotation_file=self.annotation_file,
+            mac_address=self.mac_address,
+            cache_frames=True
+        )
+        
+        # Frames are irrelevant here; keep the test offline
+        dataset._get_frame = reference._get_frame = lambda ts: np.zeros((40, 60), dtype=np.float32)
+        
+        idx = next(i for i in range(len(reference)) if len(reference[i][1]['boxes']) > 0)
+        expected = reference[idx][1]['boxes'][:, :2] * 10
+        
+        # Three "epochs" over the same sample must all see the original boxes
+        for _ in range(3):
+            _, target = dataset[idx]
+            torch.testing.assert_close(target['boxes'][:, :2], expected)
+        
+        logger.info(f"✅ Stored targets unchanged by in-place transform")
+    
+    def test_03_in_place_edit_of_returned_target(self):
+        """Test that editing a returned target in place does not change the dataset."""
+        logger.info("\nTEST: In-place Edit of Returned Target")
+        logger.info("-" * 50)
+        
+        dataset = ThermalAnnotationDataset(
+            annotation_file=self.annotation_file,
+            mac_address=self.mac_address,
+            cache_frames=True
+        )
+        
+        # Frames are irrelevant here; keep the test offline
+        dataset._get_frame = lambda ts: np.zeros((40, 60), dtype=np.float32)
+        
+        idx = next(i for i in range(len(dataset)) if len(dataset[i][1]['boxes']) > 0)
+        expected = dataset[idx][1]['boxes'].clone()
+        
+        # Typical training-loop step: scale normalized boxes to pixels
+        _, target = dataset[idx]
+        target['boxes'][:, [0, 2]] *= 60
+        target['labels'] += 1
+        
+        torch.testing.assert_close(dataset[idx][1]['boxes'], expected)
+        
+        logger.info(f"✅ Returned targets are private copies")
+    
+    def test_04_negative_index(self):
+        """Test that negative indices return the same sample as their positive form."""
+        logger.info("\nTEST: Negative Index")
+        logger.info("-" * 50)
+        
+        dataset = ThermalAnnotationDataset(
+            annotation_file=self.annotation_file,
+            mac_address=self.mac_address,
+            cache_frames=True
+        )
+        
+        # Frames are irrelevant here; keep the test offline
+        dataset._get_frame = lambda ts: np.zeros((40, 60), dtype=np.float32)
+        
+        for idx in (-1, -2, -len(dataset)):
+            _, target = dataset[idx]
+            _, expected = dataset[len(dataset) + idx]
+            self.assertEqual(target['timestamp'], expected['timestamp'])
+            torch.testing.assert_close(target['boxes'], expected['boxes'])
+            torch.testing.assert_close(target['labels'], expected['labels'])
+        
+        with self.assertRaises(IndexError):
+            dataset[-len(dataset) - 1]
+        
+        logger.info(f"✅ Negative indices resolve from the end")
+    
+    def test_05_in_place_frame_transform(self):
+        """Test that an in-place frame transform does not compound on prefetched frames."""
+        logger.info("\nTEST: In-place Frame Transform")
+        logger.info("-" * 50)
+        
+        dataset = ThermalAnnotationDataset(
+            annotation_file=self.annotation_file,
+            mac_address=self.mac_address,
+            transform=lambda t: t.mul_(2),
+            cache_frames=True
+        )
+        
+        # Prefetch synthetic frames into the packed tensor; keep the test offline
+        frames = {
+            ts: np.full((40, 60), 20.0, dtype=np.float32)
+            for ts in dataset.data_times.tolist()
+        }
+        dataset.tdengine.batch_query_frames = lambda *args, **kwargs: frames
+        dataset.prefetch_all_frames()
+        self.assertIsNotNone(dataset._frame_tensor)
+        
+        for _ in range(3):
+            frame, _ = dataset[0]
+            self.assertTrue(torch.all(frame == 40.0))
+        
+        logger.info(f"✅ Packed frames unchanged by in-place transform")
+
+
+class ThermalDatasetPersistentCacheTests(unittest.TestCase):
+    """Test suite for the on-disk persistent frame cache (offline)."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test configuration."""
+        cls.annotation_file = 'Data/Gen3_Annotated_Data_MVP/Annotations/SL18_R1_annotation.json'
+        cls.mac_address = '02:00:1a:62:51:67'
+        
+        logger.info("\n" + "=" * 70)
+        logger.info("Thermal Dataset Persistent Cache Test Suite")
+        logger.info("=" * 70 + "\n")
+    
+    def setUp(self):
+        """Create a scratch directory for the cache files."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = Path(self.tmp_dir.name) / 'frames.npy'
+    
+    def tearDown(self):
+        """Remove the scratch directory."""
+        self.tmp_dir.cleanup()
+    
+    def make_dataset(self, mac_address=None, **kwargs):
+        """Create a dataset on the scratch cache path."""
+        kwargs.setdefault('cache_frames', False)
+        return ThermalAnnotationDataset(
+            annotation_file=self.annotation_file,
+            mac_address=mac_address or self.mac_address,
+            persistent_cache_path=str(self.cache_path),
+            **kwargs
+        )
+    
+    def prefetch_synthetic(self, dataset, frame_shape=(40, 60)):
+        """Prefetch every other sample from synthetic frames instead of TDengine."""
+        rng = np.random.default_rng(0)
+        frames = {
+            ts: rng.uniform(15, 35, frame_shape).astype(np.float32)
+            for ts in dataset.data_times[::2].tolist()
+        }
+        dataset.tdengine.batch_query_frames = lambda *args, **kwargs: frames
+        dataset.prefetch_all_frames()
+        return frames
+    
+    def test_01_reopen_persistent_cache(self):
+        """Test that a written cache is reused by a new dataset on the same path."""
+        frames = self.prefetch_synthetic(self.make_dataset())
+        
+        dataset = self.make_dataset()
+        self.assertEqual(len(dataset._frame_rows), len(frames))
+        for ts, frame in frames.items():
+            np.testing.assert_array_equal(dataset._get_frame(ts), frame)
+        
+        # Only the cache and its index remain; no temporary files
+        self.assertEqual(sorted(p.name for p in self.cache_path.parent.iterdir()),
+                         ['frames.npy', 'frames_index.npz'])
+        
+        logger.info(f"✅ Reopened persistent cache with {len(frames)} frames")
+    
+    def test_02_mismatched_cache_ignored(self):
+        """Test that a cache written for another sensor is not served."""
+        self.prefetch_synthetic(self.make_dataset())
+        
+        dataset = self.make_dataset(mac_address='02:00:00:00:00:01')
+        self.assertIsNone(dataset._frame_store)
+        self.assertEqual(len(dataset._frame_rows), 0)
+        
+        logger.info(f"✅ Cache for another sensor ignored")
+    
+    def test_03_quantized_cache(self):
+        """Test that a quantized cache decodes to within 0.05 degrees."""
+        frames = self.prefetch_synthetic(self.make_dataset(quantize_cache=True))
+        
+        dataset = self.make_dataset()
+        self.assertEqual(dataset._frame_store.dtype, np.int16)
+        for ts, frame in frames.items():
+            np.testing.assert_allclose(dataset._get_frame(ts), frame, rtol=0, atol=0.0501)
+        
+        logger.info(f"✅ Quantized cache round-trip within tolerance")
+    
+    def test_04_frame_size_from_data(self):
+        """Test that the packed tensor and the cache take their size from the frames."""
+        dataset = self.make_dataset(cache_frames=True)
+        frames = self.prefetch_synthetic(dataset, frame_shape=(24, 32))
+        
+        self.assertEqual(tuple(dataset._frame_tensor.shape), (len(dataset), 1, 24, 32))
+        idx = int(np.flatnonzero(dataset._frame_loaded)[0])
+        np.testing.assert_array_equal(dataset[idx][0][0].numpy(), frames[int(dataset.data_times[idx])])
+        
+        reopened = self.make_dataset()
+        self.assertEqual(reopened._frame_store.shape, (len(dataset), 24, 32))
+        for ts, frame in frames.items():
+            np.testing.assert_array_equal(reopened._get_frame(ts), frame)
+        
+        logger.info(f"✅ Frame size taken from fetched frames")
 
 
 def run_test_suite():
@@ -357,6 +620,7 @@ def run_test_suite():
     suite.addTests(loader.loadTestsFromTestCase(ThermalDatasetCacheTests))
     suite.addTests(loader.loadTestsFromTestCase(PyTorchDataLoaderTests))
     suite.addTests(loader.loadTestsFromTestCase(ThermalDataTransformTests))
+    suite.addTests(loader.loadTestsFromTestCase(ThermalDatasetPersistentCacheTests))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)